@@ -0,0 +1,159 @@
+import json
+import logging
+import multiprocessing
+import time
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from hydro_auto_od.metrics import peak_rss_mb
+
+OUTLIER_FRACTION = 0.03
+N_CATEGORIES = 12
+
+
+def make_dataset(n_rows: int, n_features: int, categorical_ratio: float = 0.,
+                 random_state: int = 0) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Synthetic training data: a mixture of correlated gaussian clusters with a few uniform outliers.
+    Categorical columns hold string categories whose frequencies depend on the cluster.
+    :return: data frame with columns f000, f001, ... and names of its categorical columns
+    """
+    rng = np.random.RandomState(random_state)
+    n_categorical = int(round(n_features * categorical_ratio))
+    n_numerical = n_features - n_categorical
+    n_clusters = 3
+
+    cluster = rng.randint(n_clusters, size=n_rows)
+    centers = rng.uniform(-5, 5, size=(n_clusters, n_numerical))
+    mixing = rng.normal(size=(n_numerical, n_numerical)) / np.sqrt(max(n_numerical, 1))
+    numerical = centers[cluster] + rng.normal(size=(n_rows, n_numerical)) @ mixing
+    is_outlier = rng.rand(n_rows) < OUTLIER_FRACTION
+    numerical[is_outlier] = rng.uniform(-10, 10, size=(is_outlier.sum(), n_numerical))
+
+    category_weights = rng.dirichlet(np.ones(N_CATEGORIES), size=(n_clusters, n_categorical))
+    categories = np.array([f"category_{i}" for i in range(N_CATEGORIES)])
+    categorical = np.empty((n_rows, n_categorical), dtype=object)
+    for j in range(n_categorical):
+        for c in range(n_clusters):
+            rows = cluster == c
+            categorical[rows, j] = rng.choice(categories, size=rows.sum(), p=category_weights[c, j])
+
+    names = [f"f{i:03d}" for i in range(n_features)]
+    categorical_names = names[n_numerical:]
+    data = pd.DataFrame(numerical, columns=names[:n_numerical])
+    for j, name in enumerate(categorical_names):
+        data[name] = categorical[:, j]
+    return data, categorical_names
+
+
+def _isolated_target(queue, function, kwargs):
+    try:
+        result = function(**kwargs)
+        result["peak_rss_mb"] = peak_rss_mb()
+        queue.put(result)
+    except Exception:
+        queue.put({"error": traceback.format_exc()})
+
+
+def run_isolated(function: Callable[..., dict], kwargs: dict, timeout: Optional[float] = None) -> dict:
+    """
+    Runs function(**kwargs) in a freshly spawned process, so peak RSS and imports are measured
+    for this call alone. Adds peak_rss_mb to the returned dict, or returns
+    {"error": ...} if the call failed or took longer than timeout seconds.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_isolated_target, args=(queue, function, kwargs))
+    process.start()
+    try:
+        return queue.get(timeout=timeout)
+    except Exception:
+        process.terminate()
+        return {"error": f"Timed out after {timeout} seconds"}
+    finally:
+        process.join()
+
+
+def timed(function: Callable, *args, **kwargs) -> Tuple[object, float]:
+    started_at = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started_at
+
+
+def case_key(case: dict) -> str:
+    return ",".join(f"{name}={value}" for name, value in sorted(case.items()))
+
+
+def save_results(results: List[dict], path: str) -> None:
+    with open(path, "w") as fp:
+        json.dump(results, fp, indent=2)
+
+
+def compare_with_baseline(results: List[dict], baseline_path: str, metrics: List[str],
+                          tolerance: float) -> List[str]:
+    """
+    :return: descriptions of metrics which are more than tolerance (relative) worse than in the baseline,
+        results missing from the baseline are not compared
+    """
+    with open(baseline_path) as fp:
+        baseline = {case_key(result["case"]): result for result in json.load(fp)}
+    regressions = []
+    for result in results:
+        key = case_key(result["case"])
+        reference = baseline.get(key)
+        if reference is None:
+            logging.info("No baseline for %s", key)
+            continue
+        if "error" in result and "error" not in reference:
+            regressions.append(f"{key}: failed, {result['error'].strip().splitlines()[-1]}")
+            continue
+        for metric in metrics:
+            value, reference_value = result.get(metric), reference.get(metric)
+            if value is None or not reference_value:
+                continue
+            change = value / reference_value - 1
+            if change > tolerance:
+                regressions.append(f"{key}: {metric} {reference_value:.4g} -> {value:.4g} (+{change:.0%})")
+    return regressions
+
+
+def print_table(results: List[dict], metrics: List[str]) -> None:
+    case_names = sorted({name for result in results for name in result["case"]})
+    header = case_names + metrics
+    rows = []
+    for result in results:
+        row = [str(result["case"][name]) for name in case_names]
+        if "error" in result:
+            row.append(result["error"].strip().splitlines()[-1])
+        else:
+            row += [f"{result[metric]:.4g}" if isinstance(result.get(metric), float) else str(result.get(metric))
+                    for metric in metrics]
+        rows.append(row)
+    widths = [max(len(row[i]) for row in [header] + rows if i < len(row)) for i in range(len(header))]
+    for row in [header] + rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def report(results: List[dict], metrics: List[str], output: Optional[str], baseline: Optional[str],
+           tolerance: float) -> int:
+    """Prints results, saves them and compares them against the baseline. :return: process exit code"""
+    print_table(results, metrics)
+    if output:
+        save_results(results, output)
+    if baseline:
+        regressions = compare_with_baseline(results, baseline, metrics, tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+def expand_cases(**axes: List) -> List[Dict]:
+    cases = [{}]
+    for name, values in axes.items():
+        cases = [dict(case, **{name: value}) for case in cases for value in values]
+    return cases
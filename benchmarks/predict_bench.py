@@ -0,0 +1,110 @@
+"""
+Benchmarks latency of predict in the generated monitoring model.
+
+For every (model, features, categorical ratio, scorer) case a model is fitted on synthetic data and
+written with the monitoring model template as a training job does. func_main.py is then loaded from
+it in a fresh process, which reports load time, latency of predict and per-row latency of predict_batch. With --scorer no the NumPy scorer is removed, so func_main.py falls back to the joblib model.
+
+    python -m benchmarks.predict_bench --features 3 30 --output results.json
+    python -m benchmarks.predict_bench --features 3 30 --baseline results.json
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+from benchmarks.common import expand_cases, make_dataset, report, run_isolated, timed
+
+MODELS = ["IForest", "LOF", "OCSVM"]
+METRICS = ["load_time_s", "single_p50_us", "single_p99_us", "batch_per_row_us", "peak_rss_mb"]
+
+
+def write_model(folder_path, model, rows, features, categorical_ratio, scorer, random_state):
+    import numpy as np
+    from hydro_auto_od.categorical import encode_categorical
+    from hydro_auto_od.monitoring_model import write_monitoring_model
+    from hydro_auto_od.selection import build_model, contamination
+
+    data, categorical_names = make_dataset(rows, features, categorical_ratio, random_state)
+    encoded, categorical_codes = encode_categorical(data, categorical_names)
+    outlier_detector = build_model(model, {'contamination': contamination}, random_state=random_state)
+    outlier_detector.fit(np.array(encoded))
+    write_monitoring_model(folder_path, outlier_detector, list(data.columns), categorical_codes=categorical_codes)
+    if not scorer and os.path.exists(os.path.join(folder_path, "scorer.npz")):
+        os.remove(os.path.join(folder_path, "scorer.npz"))
+
+
+def measure_predict(folder_path, rows, features, categorical_ratio, batch_size, repeats, random_state):
+    import importlib.util
+    import time
+    import numpy as np
+
+    os.environ["MODEL_FILES_PATH"] = folder_path
+    spec = importlib.util.spec_from_file_location("func_main", os.path.join(folder_path, "src", "func_main.py"))
+    func_main = importlib.util.module_from_spec(spec)
+    _, load_time = timed(spec.loader.exec_module, func_main)
+
+    data, _ = make_dataset(max(rows, batch_size), features, categorical_ratio, random_state + 1)
+    requests = [{name: value.item() if isinstance(value, np.generic) else value for name, value in row.items()}
+                for row in data.head(repeats).to_dict("records")]
+    single_latencies = []
+    for request in requests:
+        started_at = time.perf_counter()
+        func_main.predict(**request)
+        single_latencies.append(time.perf_counter() - started_at)
+
+    batch = {name: np.asarray(column) for name, column in data.head(batch_size).items()}
+    batch_latencies = []
+    for _ in range(max(1, repeats // batch_size)):
+        _, batch_latency = timed(func_main.predict_batch, **batch)
+        batch_latencies.append(batch_latency)
+
+    return {
+        "load_time_s": load_time,
+        "single_p50_us": float(np.percentile(single_latencies, 50)) * 1e6,
+        "single_p99_us": float(np.percentile(single_latencies, 99)) * 1e6,
+        "batch_per_row_us": float(np.median(batch_latencies)) / batch_size * 1e6,
+        "scorer": os.path.exists(os.path.join(folder_path, "scorer.npz")),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=MODELS)
+    parser.add_argument("--features", nargs="+", type=int, default=[3, 8, 30, 100])
+    parser.add_argument("--categorical-ratio", nargs="+", type=float, default=[0., 0.3])
+    parser.add_argument("--scorer", nargs="+", choices=["yes", "no"], default=["yes", "no"],
+                        help="whether func_main.py uses the NumPy scorer or the joblib model")
+    parser.add_argument("--rows", type=int, default=10000, help="training rows of the benchmarked models")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=2000, help="number of single-row calls")
+    parser.add_argument("--random-state", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600.)
+    parser.add_argument("--output", help="path to save results as JSON, usable as a baseline later")
+    parser.add_argument("--baseline", help="path to results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative increase of a metric over the baseline reported as a regression")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    results = []
+    for case in expand_cases(model=args.models, features=args.features,
+                             categorical_ratio=args.categorical_ratio, scorer=args.scorer):
+        logging.info("Running %s", case)
+        with tempfile.TemporaryDirectory() as tmp_dir_name:
+            folder_path = os.path.join(tmp_dir_name, "auto_metric")
+            write_model(folder_path, case["model"], args.rows, case["features"], case["categorical_ratio"],
+                        case["scorer"] == "yes", args.random_state)
+            result = run_isolated(measure_predict, dict(folder_path=folder_path, rows=args.rows,
+                                                        features=case["features"],
+                                                        categorical_ratio=case["categorical_ratio"],
+                                                        batch_size=args.batch_size, repeats=args.repeats,
+                                                        random_state=args.random_state),
+                                  timeout=args.timeout)
+        results.append(dict(result, case=case))
+    return report(results, METRICS, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Benchmarks the model selection pipeline on synthetic data.
+
+Every (stage, rows, features, categorical ratio) case runs in its own process and reports
+wall time, peak RSS and number of fits:
+* compute_mv - one IForest fit and its MV curve on up to 5 features, the unit of work of tuning
+* tuning - choosing the model family with low_tuning (up to 7 features) or high_tuning
+* model_selection - select_model followed by fitting the final model, as a training job does
+
+    python -m benchmarks.selection_bench --rows 1000 10000 --features 3 8 --output results.json
+    python -m benchmarks.selection_bench --rows 1000 10000 --features 3 8 --baseline results.json
+"""
+import argparse
+import logging
+import sys
+
+from benchmarks.common import expand_cases, make_dataset, report, run_isolated, timed
+
+STAGES = ["compute_mv", "tuning", "model_selection"]
+METRICS = ["wall_time_s", "peak_rss_mb", "fits"]
+
+
+def _training_data(rows, features, categorical_ratio, random_state):
+    from hydro_auto_od.categorical import encode_categorical
+
+    data, categorical_names = make_dataset(rows, features, categorical_ratio, random_state)
+    return encode_categorical(data, categorical_names)[0]
+
+
+def run_case(stage, rows, features, categorical_ratio, n_jobs, search, ocsvm_max_rows, random_state):
+    import numpy as np
+    from pyod.models.iforest import IForest
+    from sklearn.model_selection import train_test_split
+    from hydro_auto_od import selection
+    from hydro_auto_od.tuning import TuningBudget, compute_mv, high_tuning, low_tuning
+
+    data = _training_data(rows, features, categorical_ratio, random_state)
+    budget = TuningBudget()
+    if stage == "compute_mv":
+        X = np.array(data)[:, :5]
+        x_train, x_test = train_test_split(X, test_size=0.2, random_state=random_state)
+        _, wall_time = timed(compute_mv, IForest(random_state=random_state), x_train, x_test,
+                             selection.selection_alphas, n_sim=100000, random_state=random_state)
+        budget.spend(1)
+    elif stage == "tuning":
+        x_train, x_test = train_test_split(np.array(data), test_size=0.2, random_state=random_state)
+        candidates = list(selection.models.values())
+        if x_train.shape[1] <= 7:
+            _, wall_time = timed(low_tuning, x_train, x_test, candidates, alphas=selection.selection_alphas,
+                                 n_jobs=n_jobs, random_state=random_state, search=search, budget=budget,
+                                 max_fit_rows=ocsvm_max_rows)
+        else:
+            _, wall_time = timed(high_tuning, x_train, x_test, candidates, alphas=selection.selection_alphas,
+                                 averaging=50, n_jobs=n_jobs, random_state=random_state, budget=budget,
+                                 max_fit_rows=ocsvm_max_rows)
+    else:
+        def model_selection():
+            name, params = selection.select_model(data, n_jobs=n_jobs, random_state=random_state,
+                                                  search=search, budget=budget, ocsvm_max_rows=ocsvm_max_rows)
+            selection.fit_model(selection.build_model(name, params, random_state=random_state), data,
+                                max_fit_rows=ocsvm_max_rows, random_state=random_state)
+            budget.spend(1)
+            return name, params
+        (name, params), wall_time = timed(model_selection)
+        return {"wall_time_s": wall_time, "fits": budget.n_fits, "model": name, "params": params}
+    return {"wall_time_s": wall_time, "fits": budget.n_fits}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--rows", nargs="+", type=int, default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--features", nargs="+", type=int, default=[3, 7, 8, 30, 100])
+    parser.add_argument("--categorical-ratio", nargs="+", type=float, default=[0., 0.3])
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--search", choices=["exhaustive", "halving"], default="exhaustive")
+    parser.add_argument("--ocsvm-max-rows", type=int, default=50000,
+                        help="training rows above which OCSVM is fitted on a sample, 0 to fit on every row")
+    parser.add_argument("--random-state", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=3600., help="seconds after which a case is abandoned")
+    parser.add_argument("--output", help="path to save results as JSON, usable as a baseline later")
+    parser.add_argument("--baseline", help="path to results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative increase of a metric over the baseline reported as a regression")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    results = []
+    for case in expand_cases(stage=args.stages, rows=args.rows, features=args.features,
+                             categorical_ratio=args.categorical_ratio):
+        if case["categorical_ratio"] and case["stage"] == "compute_mv":
+            continue
+        case.update(n_jobs=args.n_jobs, search=args.search, ocsvm_max_rows=args.ocsvm_max_rows or None)
+        logging.info("Running %s", case)
+        result = run_isolated(run_case, dict(case, random_state=args.random_state), timeout=args.timeout)
+        results.append(dict(result, case=case))
+    return report(results, METRICS, args.output, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
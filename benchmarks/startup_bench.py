@@ -0,0 +1,131 @@
+"""
+Benchmarks how fast the service comes up.
+
+For every (service mode, gRPC server mode) case fresh processes report:
+* import_time_s - time to import hydro_auto_od.server
+* heavy_modules - how many of the ML stack and cluster client modules that import loaded, expected to be 0
+* startup_time_s - time from starting `python -m hydro_auto_od.server` until its health check answers
+
+Neither MongoDB nor the cluster has to be reachable, the service connects to them on first use.
+Run it from the repository root:
+
+    python -m benchmarks.startup_bench --output results.json
+    python -m benchmarks.startup_bench --baseline results.json
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import case_key, expand_cases, report
+
+METRICS = ["import_time_s", "heavy_modules", "startup_time_s"]
+HEAVY_MODULES = ["numpy", "pandas", "sklearn", "pyod", "pyarrow", "s3fs", "hydrosdk"]
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+started_at = time.perf_counter()
+import hydro_auto_od.server
+import_time = time.perf_counter() - started_at
+print(json.dumps({{"import_time_s": import_time,
+                  "heavy_modules": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def _service_env(service_mode, grpc_server_mode, grpc_port):
+    env = dict(os.environ, SERVICE_MODE=service_mode, GRPC_SERVER_MODE=grpc_server_mode,
+               GRPC_PORT=str(grpc_port), METRICS_PORT="0")
+    # Required settings, the service does not connect to MongoDB on startup
+    env.setdefault("MONGO_USER", "benchmark")
+    env.setdefault("MONGO_PASS", "benchmark")
+    return env
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(service_mode, grpc_server_mode):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=_service_env(service_mode, grpc_server_mode, 0),
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_startup(service_mode, grpc_server_mode, timeout):
+    import grpc
+    from grpc_health.v1.health_pb2 import HealthCheckRequest
+    from grpc_health.v1.health_pb2_grpc import HealthStub
+
+    grpc_port = _free_port()
+    started_at = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "hydro_auto_od.server"],
+                               env=_service_env(service_mode, grpc_server_mode, grpc_port),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with grpc.insecure_channel(f"localhost:{grpc_port}") as channel:
+            health = HealthStub(channel)
+            while time.perf_counter() - started_at < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Service exited with code {process.returncode}")
+                try:
+                    health.Check(HealthCheckRequest(), timeout=0.1)
+                    return time.perf_counter() - started_at
+                except grpc.RpcError:
+                    time.sleep(0.01)
+        raise TimeoutError(f"Health check did not answer in {timeout} seconds")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_case(service_mode, grpc_server_mode, repeats, timeout):
+    try:
+        imports = [measure_import(service_mode, grpc_server_mode) for _ in range(repeats)]
+        startup_times = [measure_startup(service_mode, grpc_server_mode, timeout) for _ in range(repeats)]
+    except Exception as e:
+        return {"error": repr(e)}
+    return {
+        "import_time_s": float(np.median([result["import_time_s"] for result in imports])),
+        "heavy_modules": len(imports[0]["heavy_modules"]),
+        "heavy_module_names": imports[0]["heavy_modules"],
+        "startup_time_s": float(np.median(startup_times)),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service-modes", nargs="+", choices=["all", "api"], default=["all", "api"])
+    parser.add_argument("--grpc-server-modes", nargs="+", choices=["threads", "asyncio"],
+                        default=["threads", "asyncio"])
+    parser.add_argument("--repeats", type=int, default=5, help="runs per case, medians are reported")
+    parser.add_argument("--timeout", type=float, default=60., help="seconds to wait for the health check")
+    parser.add_argument("--output", help="path to save results as JSON, usable as a baseline later")
+    parser.add_argument("--baseline", help="path to results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative increase of a metric over the baseline reported as a regression")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    results = []
+    for case in expand_cases(service_mode=args.service_modes, grpc_server_mode=args.grpc_server_modes):
+        logging.info("Running %s", case)
+        results.append(dict(run_case(case["service_mode"], case["grpc_server_mode"], args.repeats, args.timeout),
+                            case=case))
+    exit_code = report(results, METRICS, args.output, args.baseline, args.tolerance)
+    for result in results:
+        if result.get("heavy_modules"):
+            print(f"REGRESSION {case_key(result['case'])}: importing the server loads {result['heavy_module_names']}")
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
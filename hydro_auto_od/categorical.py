@@ -0,0 +1,26 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def encode_categorical(data: pd.DataFrame, names: List[str]) -> Tuple[pd.DataFrame, Dict[str, list]]:
+    """
+    Replaces categorical columns with their category codes in the narrowest unsigned integer dtype.
+    Code len(categories) of a column is reserved for missing values and for values unseen in training,
+    the monitoring model maps new categories to it.
+    :param names: columns to encode, they are converted to categoricals unless they are already
+    :return: data with encoded columns, data itself is not modified, and categories of every column in code order
+    """
+    encoded = data.copy(deep=False)
+    categories = {}
+    for name in names:
+        column = data[name] if isinstance(data[name].dtype, pd.CategoricalDtype) else data[name].astype("category")
+        # Sorted like in OrdinalEncoder, so that codes do not depend on the order categories were read in
+        column = column.cat.remove_unused_categories()
+        column = column.cat.reorder_categories(sorted(column.cat.categories))
+        unseen_code = len(column.cat.categories)
+        codes = column.cat.codes.to_numpy()
+        encoded[name] = np.where(codes < 0, unseen_code, codes).astype(np.min_scalar_type(unseen_code))
+        categories[name] = column.cat.categories.tolist()
+    return encoded, categories
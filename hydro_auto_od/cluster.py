@@ -0,0 +1,25 @@
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from hydro_auto_od.config import config
+
+if TYPE_CHECKING:
+    from hydrosdk.cluster import Cluster
+
+
+_cluster: Optional["Cluster"] = None
+_cluster_lock = threading.Lock()
+
+
+def get_cluster() -> "Cluster":
+    """
+    Returns the client of the serving cluster, created on first use and reused afterwards.
+    hydrosdk imports pandas, so it is imported here rather than on service startup.
+    """
+    global _cluster
+    if _cluster is None:
+        with _cluster_lock:
+            if _cluster is None:
+                from hydrosdk.cluster import Cluster
+                _cluster = Cluster(config.cluster_endpoint)
+    return _cluster
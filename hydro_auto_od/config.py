@@ -1,19 +1,54 @@
 from typing import Optional
-from pydantic import BaseSettings
+from pydantic import BaseSettings, validator
+from typing_extensions import Literal
 
 class Config(BaseSettings):
     mongo_user: str
     mongo_pass: str
     s3_endpoint: Optional[str]
     debug_env: bool = True
+    service_mode: Literal["all", "api", "worker"] = "all"
     grpc_port: int = 5000
+    metrics_port: int = 9090
+    grpc_server_mode: Literal["threads", "asyncio"] = "threads"
+    grpc_max_workers: int = 5
+    grpc_launch_workers: int = 4
+    grpc_status_workers: int = 4
     cluster_endpoint: str = "http://localhost"
     default_runtime: str = "hydrosphere/serving-runtime-python-3.7:3.0.0-dev4"
-    default_timeout: int = 120
+    prebuilt_runtime: Optional[str] = None
+    prebuilt_runtime_packages: Optional[str] = None
     mongo_url: str = "localhost"
     mongo_port: int = 27017
     mongo_auth_db: str = "admin"
     mongo_db: str = "auto_od"
+    status_cache_ttl: float = 1.0
+    max_training_jobs: int = 2
+    max_jobs_per_worker: int = 8
+    training_job_timeout: int = 6 * 60 * 60
+    scheduler_poll_interval: float = 5.0
+    lease_duration: float = 60.0
+    lease_heartbeat_interval: float = 15.0
+    release_poll_interval: float = 10.0
+    release_timeout: int = 20 * 60
+    training_data_max_rows: Optional[int] = 500000
+    training_data_chunk_size: int = 100000
+    selection_cache_enabled: bool = True
+    selection_cache_ttl: int = 30 * 24 * 60 * 60
+    selection_cache_max_entries: int = 10000
+    retrain_mode: Literal["full", "refit", "calibrate"] = "refit"
+    tuning_n_jobs: int = 1
+    tuning_random_state: Optional[int] = None
+    tuning_search: Literal["exhaustive", "halving"] = "exhaustive"
+    tuning_max_fits: Optional[int] = None
+    tuning_max_seconds: Optional[float] = None
+    lof_approximate_neighbors_rows: Optional[int] = None
+    ocsvm_max_rows: Optional[int] = 50000
+
+    @validator("training_data_max_rows", "ocsvm_max_rows")
+    def zero_disables_row_cap(cls, value: Optional[int]) -> Optional[int]:
+        # Row caps default to a number, so 0 is the way to turn them off
+        return value or None
 
     class Config:
         case_sensitive = False
@@ -0,0 +1,212 @@
+import hashlib
+import os
+from functools import partial
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from s3fs import S3FileSystem
+from hydro_serving_grpc.serving.contract.field_pb2 import ModelField
+from hydro_serving_grpc.serving.contract.types_pb2 import DT_STRING
+
+from hydro_auto_od.utils import DTYPE_TO_NAMES
+from hydro_auto_od.config import config
+
+
+# Signature dtype names which are not valid numpy dtype names themselves
+_NAME_TO_NUMPY_DTYPE = {
+    "half": "float16",
+    "float": "float32",
+    "double": "float64",
+}
+
+
+def _numpy_dtypes(fields: List[ModelField]) -> Dict[str, np.dtype]:
+    return {field.name: np.dtype(_NAME_TO_NUMPY_DTYPE.get(DTYPE_TO_NAMES[field.dtype], DTYPE_TO_NAMES[field.dtype]))
+            for field in fields if field.dtype in DTYPE_TO_NAMES}
+
+
+def _categorical_names(fields: List[ModelField]) -> List[str]:
+    return [field.name for field in fields if field.dtype == DT_STRING]
+
+
+def _concat(frames: List[pd.DataFrame], categorical_names: List[str]) -> pd.DataFrame:
+    """Concatenates frames, keeping categorical columns categorical with the union of their categories"""
+    if len(frames) > 1:
+        for name in categorical_names:
+            categories = union_categoricals([frame[name] for frame in frames], ignore_order=True).categories
+            for frame in frames:
+                frame[name] = frame[name].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _fits_integer_dtype(column: pd.Series, dtype: np.dtype) -> bool:
+    """Whether every value of a column is in the range of an integer dtype"""
+    if column.empty:
+        return True
+    info = np.iinfo(dtype)
+    return info.min <= column.min() and column.max() <= info.max
+
+
+def _downcast(chunk: pd.DataFrame, dtypes: Dict[str, np.dtype]) -> pd.DataFrame:
+    for name, dtype in dtypes.items():
+        column = chunk[name]
+        # Integer columns with missing values can not be narrowed, keep them as floats.
+        # Values out of range of the declared dtype would wrap around, such columns keep the wider dtype
+        if dtype.kind in "iu" and (column.isna().any() or not _fits_integer_dtype(column, dtype)):
+            continue
+        if column.dtype != dtype:
+            chunk[name] = column.astype(dtype)
+    return chunk
+
+
+def _reservoir_sample(chunks: Iterable[pd.DataFrame], max_rows: int, rng: np.random.RandomState,
+                      categorical_names: List[str]) -> Optional[pd.DataFrame]:
+    """
+    Uniform sample of at most max_rows rows from a stream of chunks.
+    Every row gets a random key and the rows with the smallest keys are kept,
+    so memory is bounded by max_rows plus one chunk.
+    """
+    sample, sample_keys = None, None
+    for chunk in chunks:
+        keys = rng.random_sample(len(chunk))
+        if sample is not None:
+            chunk = _concat([sample, chunk], categorical_names)
+            keys = np.concatenate([sample_keys, keys])
+        if len(chunk) > max_rows:
+            kept = np.sort(np.argpartition(keys, max_rows)[:max_rows])
+            chunk, keys = chunk.iloc[kept].reset_index(drop=True), keys[kept]
+        sample, sample_keys = chunk, keys
+    return sample
+
+
+def _is_local(training_data_path: str) -> bool:
+    return not config.s3_endpoint and "://" not in training_data_path
+
+
+def _s3() -> S3FileSystem:
+    client_kwargs = {'endpoint_url': config.s3_endpoint} if config.s3_endpoint else {}
+    return S3FileSystem(client_kwargs=client_kwargs)
+
+
+def _open(training_data_path: str):
+    if _is_local(training_data_path):
+        return open(training_data_path, mode='rb')
+    return _s3().open(training_data_path, mode='rb')
+
+
+def fingerprint(training_data_path: str) -> str:
+    """Identifies training data content by its S3 ETag when there is one, otherwise by sha256 of the file"""
+    if not _is_local(training_data_path):
+        etag = _s3().info(training_data_path).get('ETag')
+        if etag:
+            return "etag:" + etag.strip('"')
+    digest = hashlib.sha256()
+    with _open(training_data_path) as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return "sha256:" + digest.hexdigest()
+
+
+CSV, PARQUET, ARROW = "csv", "parquet", "arrow"
+
+_EXTENSION_TO_FORMAT = {
+    ".parquet": PARQUET,
+    ".pq": PARQUET,
+    ".arrow": ARROW,
+    ".feather": ARROW,
+    ".ipc": ARROW,
+}
+
+_MAGIC_TO_FORMAT = {
+    b"PAR1": PARQUET,
+    b"ARROW1": ARROW,
+    b"FEA1": ARROW,
+}
+
+
+def detect_format(training_data_path: str) -> str:
+    """Detects training data format by file extension, falling back to magic bytes and then to CSV"""
+    extension = os.path.splitext(training_data_path)[1].lower()
+    if extension in _EXTENSION_TO_FORMAT:
+        return _EXTENSION_TO_FORMAT[extension]
+    with _open(training_data_path) as file:
+        header = file.read(max(map(len, _MAGIC_TO_FORMAT)))
+    for magic, data_format in _MAGIC_TO_FORMAT.items():
+        if header.startswith(magic):
+            return data_format
+    return CSV
+
+
+def _read_csv(training_data_path: str, names: List[str], dtypes: Dict[str, np.dtype], categorical_names: List[str],
+              max_rows: Optional[int], chunk_size: int, rng: np.random.RandomState) -> Optional[pd.DataFrame]:
+    read_dtypes = {name: dtype for name, dtype in dtypes.items() if dtype.kind == "f"}
+    # Strings are parsed straight into categoricals, never held as a column of Python objects
+    read_dtypes.update({name: "category" for name in categorical_names})
+    with _open(training_data_path) as file:
+        chunks = (_downcast(chunk, dtypes)
+                  for chunk in pd.read_csv(file, names=names, dtype=read_dtypes, chunksize=chunk_size))
+        if max_rows is None:
+            chunks = list(chunks)
+            return _concat(chunks, categorical_names) if chunks else None
+        return _reservoir_sample(chunks, max_rows, rng, categorical_names)
+
+
+def _read_columnar(training_data_path: str, data_format: str, names: List[str], dtypes: Dict[str, np.dtype],
+                   categorical_names: List[str], max_rows: Optional[int], rng: np.random.RandomState) -> pd.DataFrame:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    if data_format == PARQUET:
+        # Parquet string columns are usually dictionary-encoded already and are read as such
+        read_table = partial(pq.read_table, read_dictionary=categorical_names)
+    else:
+        read_table = feather.read_table
+    # Only the columns used by the signature are read, local files are memory-mapped
+    if _is_local(training_data_path):
+        table = read_table(training_data_path, columns=names, memory_map=True)
+    else:
+        with _open(training_data_path) as file:
+            table = read_table(file, columns=names)
+
+    if max_rows is not None and table.num_rows > max_rows:
+        table = table.take(np.sort(rng.choice(table.num_rows, size=max_rows, replace=False)))
+    # Dictionary-encoded columns become pandas categoricals
+    for name in categorical_names:
+        column = table.column(name)
+        if not pa.types.is_dictionary(column.type):
+            table = table.set_column(table.schema.get_field_index(name), name, column.dictionary_encode())
+    return _downcast(table.to_pandas(), dtypes)
+
+
+def read_training_data(training_data_path: str, fields: List[ModelField], max_rows: Optional[int] = None,
+                       chunk_size: int = 100000, random_state=None) -> pd.DataFrame:
+    """
+    Reads training data, casting columns to the dtypes declared in the signature
+    and keeping a uniform sample of at most max_rows rows.
+
+    CSV files are streamed in chunks of chunk_size rows. Parquet and Arrow IPC/Feather files
+    are read column-projected to the signature fields. DT_STRING fields are read as categoricals.
+    :param training_data_path: local path or path pointing to s3
+    :param fields: signature fields to read, columns are named after them in sorted order
+    :param max_rows: maximum number of rows to keep, None keeps all of them
+    :return: pd.DataFrame with columns ordered by field name
+    """
+    fields = sorted(fields, key=lambda field: field.name)
+    names = [field.name for field in fields]
+    dtypes = _numpy_dtypes(fields)
+    categorical_names = _categorical_names(fields)
+    rng = np.random.RandomState(random_state)
+
+    data_format = detect_format(training_data_path)
+    if data_format == CSV:
+        training_data = _read_csv(training_data_path, names, dtypes, categorical_names, max_rows, chunk_size, rng)
+    else:
+        training_data = _read_columnar(training_data_path, data_format, names, dtypes, categorical_names,
+                                       max_rows, rng)
+
+    if training_data is None:
+        return pd.DataFrame(columns=names)
+    return training_data[names]
@@ -1,54 +1,61 @@
 import datetime
 import glob
-import json
 import logging
 import os
-import joblib
 import tempfile
-from typing import Tuple
-from multiprocessing import Process
-from shutil import copytree
-from typing import List
+from functools import partial
+from typing import Callable, List, Optional, Tuple
 import pandas as pd
-from s3fs import S3FileSystem
-from sklearn.preprocessing import OrdinalEncoder
+from pyod.models.base import BaseDetector
 
 
 from hydrosdk.modelversion import ModelVersion, ModelVersionBuilder
-from hydrosdk.exceptions import BadRequestException, TimeoutException
-from hydrosdk.cluster import Cluster
+from hydrosdk.exceptions import BadRequestException
 from hydrosdk.image import DockerImage
 from hydrosdk.monitoring import ThresholdCmpOp, MetricSpecConfig, MetricSpec
 from hydro_serving_grpc.serving.contract.field_pb2 import ModelField
+from hydro_serving_grpc.serving.contract.types_pb2 import DT_STRING
 
 from hydro_auto_od.utils import get_monitoring_signature_from_monitored_model, DTYPE_TO_NAMES
-from hydro_auto_od.selection import model_selection
+from hydro_auto_od.selection import select_model, build_model, fit_model, recalibrate, selection_setup
+from hydro_auto_od.selection_cache import SelectionCache
+from hydro_auto_od.tuning import TuningBudget
+from hydro_auto_od.ingestion import read_training_data, fingerprint
+from hydro_auto_od.categorical import encode_categorical
+from hydro_auto_od.monitoring_model import select_runtime, write_monitoring_model
 from hydro_auto_od.tabular_od_methods import TabularOD
 from hydro_auto_od.training_status_storage import TrainingStatusStorage, AutoODMethodStatuses, TrainingStatus
+from hydro_auto_od.cluster import get_cluster
+from hydro_auto_od.workers import job_scheduler
 from hydro_auto_od.config import config
 
 
-hs_cluster = Cluster(config.cluster_endpoint)
-
-def process_auto_metric_request(training_data_path: str, monitored_model_version_id: int) -> Tuple[int, str]:
-    logging.info("Started processing auto-od request for modelversion_id=%d", monitored_model_version_id)
-
-    try:
-        model_version = ModelVersion.find_by_id(hs_cluster, monitored_model_version_id)
-    except BadRequestException as e:
-        logging.error(f"{str(e)}")
-        return 400, f"Model with modelversion_id={monitored_model_version_id} is not found"
-
-    if TrainingStatusStorage.find_by_model_version_id(monitored_model_version_id) is not None:
+def prepare_training_status(model_version: ModelVersion, training_data_path: str, priority: int,
+                            previous_status: Optional[TrainingStatus]) -> Tuple[int, str, Optional[TrainingStatus]]:
+    """
+    Decides what to do with a request to create an auto-od metric for an existing model version.
+    :return: response code and description, and the status to save if the request is accepted
+    """
+    monitored_model_version_id = model_version.id
+    if previous_status is not None and not previous_status.is_finished:
         logging.info("A training job is already requested for modelversion_id=%d", monitored_model_version_id)
-        return 409, f"A training job is already requested for modelversion_id={monitored_model_version_id}"
+        return 409, f"A training job is already requested for modelversion_id={monitored_model_version_id}", None
 
     if TabularOD.supports_signature(model_version.signature):
-        p = Process(target=train_and_deploy_monitoring_model,
-                    args=(monitored_model_version_id, training_data_path))
-        p.start()
-        logging.info("Started a training job for modelversion_id=%d", monitored_model_version_id)
-        return 202, f"Started a training job for modelversion_id={monitored_model_version_id}"
+        model_status = TrainingStatus(
+            model_version_id=monitored_model_version_id,
+            training_data_path=training_data_path,
+            state=AutoODMethodStatuses.PENDING,
+            description="Training job is queued",
+            priority=priority,
+        )
+        if previous_status is not None:
+            # Retraining on fresh data reuses the previously selected model
+            model_status.model_name = previous_status.model_name
+            model_status.model_params = previous_status.model_params
+            model_status.metric_model_version_id = previous_status.metric_model_version_id
+        logging.info("Queued a training job for modelversion_id=%d", monitored_model_version_id)
+        return 202, f"Queued a training job for modelversion_id={monitored_model_version_id}", model_status
     else:
         logging.warning(
             "Signature of modelversion_id=%d is not supported for creating auto-od metric, aborting", 
@@ -62,75 +69,290 @@ def process_auto_metric_request(training_data_path: str, monitored_model_version
             state=AutoODMethodStatuses.NOT_SUPPORTED, 
             description=description,
         )
+        return 200, f"Model state is {model_status.state}, {model_status.description}", model_status
+
+
+def process_auto_metric_request(training_data_path: str, monitored_model_version_id: int,
+                                priority: int = 0) -> Tuple[int, str]:
+    logging.info("Started processing auto-od request for modelversion_id=%d", monitored_model_version_id)
+
+    try:
+        model_version = ModelVersion.find_by_id(get_cluster(), monitored_model_version_id)
+    except BadRequestException as e:
+        logging.error(f"{str(e)}")
+        return 400, f"Model with modelversion_id={monitored_model_version_id} is not found"
+
+    previous_status = TrainingStatusStorage.find_by_model_version_id(monitored_model_version_id)
+    code, description, model_status = prepare_training_status(model_version, training_data_path, priority,
+                                                              previous_status)
+    if model_status is not None:
         TrainingStatusStorage.save_status(model_status)
-        return 200, f"Model state is {model_status.state}, {model_status.description}"
+        if model_status.state == AutoODMethodStatuses.PENDING:
+            job_scheduler.notify()
+    return code, description
+
+
+def process_bulk_auto_metric_request(requests: List[Tuple[str, int]], priority: int = 0) -> List[Tuple[int, str]]:
+    """
+    Same as process_auto_metric_request for many (training_data_path, modelversion_id) pairs,
+    with one request to the cluster, one status query and one bulk write.
+    :return: response code and description for every pair
+    """
+    logging.info("Started processing bulk auto-od request for %d model versions", len(requests))
+    requested_ids = {monitored_model_version_id for _, monitored_model_version_id in requests}
+    model_versions = {model_version.id: model_version for model_version in ModelVersion.list(get_cluster())
+                      if model_version.id in requested_ids}
+    previous_statuses = TrainingStatusStorage.find_by_model_version_ids(list(requested_ids))
 
+    results, model_statuses = [], {}
+    for training_data_path, monitored_model_version_id in requests:
+        model_version = model_versions.get(monitored_model_version_id)
+        if model_version is None:
+            logging.error("Model with modelversion_id=%d is not found", monitored_model_version_id)
+            results.append((400, f"Model with modelversion_id={monitored_model_version_id} is not found"))
+            continue
+        # A model version repeated in the request conflicts with its first occurrence
+        previous_status = model_statuses.get(monitored_model_version_id,
+                                             previous_statuses.get(monitored_model_version_id))
+        code, description, model_status = prepare_training_status(model_version, training_data_path, priority,
+                                                                  previous_status)
+        if model_status is not None:
+            model_statuses[monitored_model_version_id] = model_status
+        results.append((code, description))
 
-def upload_model_with_circuit_breaker(mv: ModelVersion, times: int=3, timeout: int=120):
-    if times <= 0:
-        raise TimeoutException
+    TrainingStatusStorage.save_statuses(list(model_statuses.values()))
+    if any(model_status.state == AutoODMethodStatuses.PENDING for model_status in model_statuses.values()):
+        job_scheduler.notify()
+    return results
+
+
+def remove_metric(monitored_model: ModelVersion, metric_model_version_id: int) -> None:
+    """Detaches a metric previously created for the monitored model by a training job"""
+    for metric_spec in MetricSpec.find_by_modelversion(get_cluster(), monitored_model.id):
+        if metric_spec.config.modelversion_id == metric_model_version_id:
+            logging.info("Removing metric with modelversion_id=%d from modelversion_id=%d",
+                         metric_model_version_id, monitored_model.id)
+            MetricSpec.delete(get_cluster(), metric_spec.id)
+
+
+def assign_monitoring_metric(model_status: TrainingStatus, metric_model_version: ModelVersion) -> None:
+    """Assigns a released monitoring model as a metric of its monitored model, replacing the previous one"""
+    logging.info(
+        "Assigning the outlier detector with modelversion_id=%d to the base model with "
+        "modelversion_id=%d as metric", metric_model_version.id, model_status.model_version_id)
+    monitored_model = ModelVersion.find_by_id(get_cluster(), model_status.model_version_id)
+    metric = metric_model_version.as_metric(threshold=model_status.metric_threshold, comparator=ThresholdCmpOp.LESS)
+    # Both model versions are known to be released, so there is no need to wait for them
+    monitored_model.assign_metrics([metric], wait=False)
+    if model_status.metric_model_version_id is not None:
+        remove_metric(monitored_model, model_status.metric_model_version_id)
+    model_status.metric_model_version_id = metric_model_version.id
+    model_status.success()
+    TrainingStatusStorage.save_status(model_status)
+    logging.info("Finished creating an outlier detector for modelversion_id=%d", model_status.model_version_id)
+
+
+class LeaseLostError(Exception):
+    """Training job was taken over by another worker after its lease expired"""
+
+
+def save_job_status(model_status: TrainingStatus) -> None:
+    """Saves the status of a training job run by this process, as long as the job is leased to it"""
+    if not TrainingStatusStorage.save_leased_status(model_status):
+        raise LeaseLostError(f"Training job for modelversion_id={model_status.model_version_id} "
+                             f"is not leased to {model_status.lease_owner} anymore")
+
+
+def get_selection_cache_key(training_data_path: str, supported_fields: List[ModelField]) -> Optional[str]:
+    if not config.selection_cache_enabled:
+        return None
+    setup = dict(selection_setup(),
+                 training_data_max_rows=config.training_data_max_rows,
+                 tuning_random_state=config.tuning_random_state,
+                 tuning_search=config.tuning_search,
+                 tuning_max_fits=config.tuning_max_fits,
+                 tuning_max_seconds=config.tuning_max_seconds,
+                 lof_approximate_neighbors_rows=config.lof_approximate_neighbors_rows,
+                 ocsvm_max_rows=config.ocsvm_max_rows)
     try:
-        mv.lock_till_released(timeout)
-    except TimeoutException:
-        upload_model_with_circuit_breaker(mv, times=times-1, timeout=timeout*1.5)
+        return SelectionCache.key(fingerprint(training_data_path), supported_fields, setup)
+    except Exception as e:
+        logging.warning("Failed to fingerprint training data at %s: %s", training_data_path, e)
+        return None
 
 
-def train_and_deploy_monitoring_model(monitored_model_version_id: int, training_data_path: str) -> int:
+def fit_outlier_detector(model_status: TrainingStatus, training_data: pd.DataFrame,
+                         can_recalibrate: bool,
+                         selection_cache_key: Optional[Callable[[], Optional[str]]] = None) -> BaseDetector:
+    """
+    Fits an outlier detector for a training job. If a previous job for the same model version
+    has already selected a model, the search is skipped according to config.retrain_mode:
+    * full - select a model from scratch
+    * refit - fit the previously selected model with its parameters on new data
+    * calibrate - only refresh training score statistics of the previously fitted model
+    Otherwise a model selection result cached for the same data is reused when there is one.
+    :param selection_cache_key: returns the key of the cached model selection result, called only
+        when a model has to be selected, since fingerprinting training data reads all of it
+    """
+    model_version_id = model_status.model_version_id
+    retraining = model_status.model_name is not None and config.retrain_mode != "full"
+
+    # Categorical codes are refitted on new data, so the previous model can not be reused as is
+    if retraining and config.retrain_mode == "calibrate" and can_recalibrate:
+        previous_model = TrainingStatusStorage.load_model(model_version_id)
+        if previous_model is not None:
+            logging.info("Refreshing score calibration of the outlier model for modelversion_id=%d", model_version_id)
+            model_status.start_stage("calibrate_model")
+            save_job_status(model_status)
+            outlier_detector = recalibrate(previous_model, training_data)
+            model_status.finish_stage(rows=len(training_data))
+            return outlier_detector
+
+    if retraining:
+        logging.info("Refitting previously selected outlier model=%s for modelversion_id=%d",
+                     model_status.model_name, model_version_id)
+    else:
+        cache_key = selection_cache_key() if selection_cache_key is not None else None
+        cached_selection = SelectionCache.get(cache_key) if cache_key is not None else None
+        if cached_selection is not None:
+            logging.info("Reusing cached model selection result for modelversion_id=%d", model_version_id)
+            model_status.model_name, model_status.model_params = cached_selection
+        else:
+            logging.info("Running outlier model selection algorithm for modelversion_id=%d", model_version_id)
+            budget = TuningBudget(max_fits=config.tuning_max_fits, max_seconds=config.tuning_max_seconds)
+            model_family_fits = 0
+            model_status.start_stage("select_model", AutoODMethodStatuses.SELECTING_MODEL,
+                                     "Selecting an outlier detection model")
+            save_job_status(model_status)
+
+            def on_parameter_tuning(chosen_name: str) -> None:
+                nonlocal model_family_fits
+                model_family_fits = budget.n_fits
+                model_status.finish_stage(rows=len(training_data), fits=model_family_fits)
+                model_status.start_stage("tune_parameters", AutoODMethodStatuses.SELECTING_PARAMETERS,
+                                         f"Tuning hyperparameters of {chosen_name}")
+                save_job_status(model_status)
+
+            model_status.model_name, model_status.model_params = select_model(
+                training_data, n_jobs=config.tuning_n_jobs, random_state=config.tuning_random_state,
+                search=config.tuning_search, budget=budget,
+                approx_neighbors_rows=config.lof_approximate_neighbors_rows,
+                on_parameter_tuning=on_parameter_tuning, ocsvm_max_rows=config.ocsvm_max_rows)
+            model_status.finish_stage(rows=len(training_data), fits=budget.n_fits - model_family_fits)
+            if cache_key is not None:
+                SelectionCache.put(cache_key, model_status.model_name, model_status.model_params)
+
+    model_status.start_stage("fit_model")
+    save_job_status(model_status)
+    outlier_detector = build_model(model_status.model_name, model_status.model_params,
+                                   random_state=config.tuning_random_state)
+    outlier_detector = fit_model(outlier_detector, training_data, max_fit_rows=config.ocsvm_max_rows,
+                                 random_state=config.tuning_random_state)
+    model_status.finish_stage(rows=len(training_data), fits=1)
+    return outlier_detector
+
+
+def train_and_deploy_monitoring_models(monitored_model_version_ids: List[int], training_data_path: str,
+                                       lease_owner: Optional[str] = None) -> None:
+    """
+    Runs training jobs for model versions sharing the same training data one after another,
+    reading the data once for model versions with the same supported fields
+    :param lease_owner: worker the jobs are leased to, statuses are saved only while it holds their leases
+    """
+    training_data_cache = {}
+    for monitored_model_version_id in monitored_model_version_ids:
+        try:
+            train_and_deploy_monitoring_model(monitored_model_version_id, training_data_path,
+                                              training_data_cache=training_data_cache, lease_owner=lease_owner)
+        except LeaseLostError as e:
+            logging.warning("Stopped training job for modelversion_id=%d: %s", monitored_model_version_id, e)
+        except Exception as e:
+            logging.exception("Training job for modelversion_id=%d failed", monitored_model_version_id)
+            model_status = TrainingStatusStorage.find_by_model_version_id(monitored_model_version_id)
+            if model_status is not None and not model_status.is_finished and model_status.lease_owner == lease_owner:
+                model_status.failing(f"Training job failed due to: {e}")
+                TrainingStatusStorage.save_leased_status(model_status)
+
+
+def train_and_deploy_monitoring_model(monitored_model_version_id: int, training_data_path: str,
+                                      training_data_cache: Optional[dict] = None,
+                                      lease_owner: Optional[str] = None) -> int:
     """
     This function:
     1. Downloads training data from S3 into pd.Dataframe
     2. Uses this training data to apply EM-MV method to choose a model
     3. Packs this model into temporary folder, and then into LocalModel
     4. Uploads this LocalModel to the cluster
-    5. After this model finishes assembly, attach it as a metric to the monitored model
+    5. Leaves the job in DEPLOYING, the release watcher attaches the model as a metric to the monitored model
+       after it finishes assembly
     :param monitored_model_version_id:
     :param training_data_path: path pointing to s3
+    :param training_data_cache: training data read by previous jobs of the same worker, keyed by supported fields
+    :param lease_owner: worker the job is leased to, statuses are saved only while it holds the lease
     :return:
     """
     # This method is intended to be used in another process,
     # so we need to create new MongoClient after fork
     description = f"AutoOD training job started at {datetime.datetime.now()}"
-    model_status = TrainingStatus(
-        model_version_id=monitored_model_version_id, 
-        training_data_path=training_data_path, 
-        state=AutoODMethodStatuses.STARTED, 
-        description=description
-    )
-    TrainingStatusStorage.save_status(model_status)
+    model_status = TrainingStatusStorage.find_by_model_version_id(monitored_model_version_id)
+    if model_status is None:
+        model_status = TrainingStatus(
+            model_version_id=monitored_model_version_id, 
+            training_data_path=training_data_path, 
+            state=AutoODMethodStatuses.STARTED, 
+            description=description
+        )
+        # Jobs started outside of the scheduler have no status, and no lease, yet
+        TrainingStatusStorage.save_status(model_status)
+    elif model_status.lease_owner != lease_owner:
+        raise LeaseLostError(f"Training job for modelversion_id={monitored_model_version_id} "
+                             f"is leased to {model_status.lease_owner}")
+    model_status.starting(description)
+    model_status.start_stage("read_training_data")
+    save_job_status(model_status)
 
     logging.info("Retrieving monitored model modelversion_id=%d", monitored_model_version_id)
-    monitored_model = ModelVersion.find_by_id(hs_cluster, monitored_model_version_id)
+    monitored_model = ModelVersion.find_by_id(get_cluster(), monitored_model_version_id)
     supported_fields: List[ModelField] = TabularOD.get_compatible_fields(monitored_model.signature.inputs)
     supported_fields_names: List[str] = sorted([field.name for field in supported_fields])
-    encoder = False
 
     logging.info(
         "Reading training data from %s for modelversion_id=%d", 
         training_data_path, monitored_model_version_id)
-    if config.s3_endpoint:
-        s3 = S3FileSystem(client_kwargs={'endpoint_url': config.s3_endpoint})
-        training_data = pd.read_csv(s3.open(training_data_path, mode='rb', names=supported_fields_names))
+    training_data_key = tuple((field.name, field.dtype) for field in supported_fields)
+    if training_data_cache is not None and training_data_key in training_data_cache:
+        logging.info("Reusing training data read by a previous job")
+        training_data = training_data_cache[training_data_key]
     else:
-        training_data = pd.read_csv(training_data_path, names=supported_fields_names)
+        training_data = read_training_data(training_data_path, supported_fields,
+                                           max_rows=config.training_data_max_rows,
+                                           chunk_size=config.training_data_chunk_size,
+                                           random_state=config.tuning_random_state)
+        if training_data_cache is not None:
+            # Keep only the latest data, jobs are not ordered by their fields
+            training_data_cache.clear()
+            training_data_cache[training_data_key] = training_data
 
-    if 7 in [i.dtype for i in monitored_model.signature.inputs]:
-        extr_features = []
-        categorical_encoder = OrdinalEncoder(dtype ='int64')
-        for i in monitored_model.signature.inputs:
-            if i.dtype == 7:
-                extr_features.append(i.name)
-        training_data[extr_features] = categorical_encoder.fit_transform(training_data[extr_features])
-        encoder = True
+    # Training data may be shared with the next jobs of this worker, encoding returns a new frame
+    categorical_features = [field.name for field in supported_fields if field.dtype == DT_STRING]
+    training_data, categorical_codes = encode_categorical(training_data, categorical_features)
+    model_status.finish_stage(rows=len(training_data))
 
-    logging.info(
-        "Running outlier model selection algorithm for modelversion_id=%d", monitored_model_version_id)
-    outlier_detector = model_selection(training_data[supported_fields_names])
+    outlier_detector = fit_outlier_detector(model_status, training_data[supported_fields_names],
+                                            can_recalibrate=not categorical_features,
+                                            selection_cache_key=partial(get_selection_cache_key, training_data_path,
+                                                                        supported_fields))
+    try:
+        TrainingStatusStorage.save_model(monitored_model_version_id, outlier_detector)
+    except Exception as e:
+        logging.warning("Failed to store the outlier model for modelversion_id=%d: %s", monitored_model_version_id, e)
     
     logging.info(
         "Selected an outlier model=%s for modelversion_id=%d", 
         repr(outlier_detector), monitored_model_version_id)
     model_status.deploying("Uploading metric to the cluster")
-    TrainingStatusStorage.save_status(model_status)
+    model_status.start_stage("upload_monitoring_model")
+    save_job_status(model_status)
 
     try:
         # Create temporary directory to copy monitoring model template there
@@ -138,76 +360,38 @@ def train_and_deploy_monitoring_model(monitored_model_version_id: int, training_
         with tempfile.TemporaryDirectory() as tmp_dir_name:
             monitoring_model_folder_path = \
                 f"{tmp_dir_name}/{monitored_model.name}v{monitored_model.version}_auto_metric"
-            copytree(os.path.dirname(__file__) + "/resources/monitoring_model_template", monitoring_model_folder_path)
-            joblib.dump(outlier_detector, f'{monitoring_model_folder_path}/outlier_detector.joblib')
-
-            # Save names and dtypes of analysed model fields to use in handling new requests in func_main.py
-            monitoring_model_config = {"field_names": supported_fields_names}
-            with open(f"{monitoring_model_folder_path}/fields_config.json", "w+") as fields_config_file:
-                json.dump(monitoring_model_config, fields_config_file)
-                
-            if encoder:
-                joblib.dump(categorical_encoder, f'{monitoring_model_folder_path}/categorical_encoder.joblib')
-                cat_features = {"categorical_features": extr_features}
-                with open(f"{monitoring_model_folder_path}/categorical_features.json", "w+") as fields_file:
-                    json.dump(cat_features, fields_file)
-                    
+            write_monitoring_model(monitoring_model_folder_path, outlier_detector, supported_fields_names,
+                                   categorical_codes=categorical_codes)
+
             payload_filenames = [os.path.basename(path) for path in glob.glob(f"{monitoring_model_folder_path}/*")]
+            runtime, install_command = select_runtime(monitoring_model_folder_path)
             model_version_builder = ModelVersionBuilder(monitored_model.name + "_metric", monitoring_model_folder_path) \
                 .with_signature(get_monitoring_signature_from_monitored_model(monitored_model)) \
                 .with_payload(payload_filenames) \
-                .with_runtime(DockerImage.from_string(config.default_runtime)) \
+                .with_runtime(DockerImage.from_string(runtime)) \
                 .with_metadata({
                     "created_by": "hydro_auto_od",
                     "is_metric": 'True',
                     "training_data_path": training_data_path,
                     "monitored_model_id": str(monitored_model_version_id),
                     "monitored_model": repr(monitored_model)
-                }) \
-                .with_install_command("pip install -r requirements.txt")
+                })
+            if install_command is not None:
+                model_version_builder.with_install_command(install_command)
             
             logging.info("Uploading a monitoring model for modelversion_id=%d", monitored_model_version_id)
-            model_version = model_version_builder.build(hs_cluster)
+            model_version = model_version_builder.build(get_cluster())
 
-        upload_model_with_circuit_breaker(model_version, timeout=config.default_timeout)
-
-    except TimeoutException as e:
-        logging.error(
-            "Timed out waiting for the outlier detector with modelversion_id=%d to build for "
-            "the base model with modelversion_id=%d", model_version.id, monitored_model.id)
-        model_status.failing("Monitoring model timed out during model build")
-        TrainingStatusStorage.save_status(model_status)
-        return -1
-    
-    except ModelVersion.ReleaseFailed as e:
-        logging.error(
-            "Outlier detector with modelversion_id=%d failed to build for "
-            "the base model with modelversion_id=%d", model_version.id, monitored_model.id)
-        model_status.failing("Monitoring model failed to build")
-        TrainingStatusStorage.save_status(model_status)
-        return -1
-        
     except Exception as e:
         logging.exception("Error occurred while uploading an outlier detector for modelversion_id=%d: %s", monitored_model.id, e)
         model_status.failing(f"Failed to pack & deploy monitoring model to a cluster due to: {str(e)}")
-        TrainingStatusStorage.save_status(model_status)
+        save_job_status(model_status)
         return -1
 
-    try:
-        logging.info(
-            "Assigning the outlier detector with modelversion_id=%d to the base model with "
-            "modelversion_id=%d as metric", model_version.id, monitored_model.id)
-        metric = model_version.as_metric(
-            threshold=1.0-outlier_detector.contamination, 
-            comparator=ThresholdCmpOp.LESS)
-        monitored_model.assign_metrics([metric])
-    except Exception as e:
-        logging.exception("Error occurred while assigning monitoring metric for modelversion_id=%d", monitored_model.id)
-        model_status.failing(f"Failed to assign monitoring metrics to the model")
-        TrainingStatusStorage.save_status(model_status)
-        return -1
-
-    model_status.success()
-    TrainingStatusStorage.save_status(model_status)
-    logging.info("Finished creating an outlier detector for modelversion_id=%d", monitored_model.id)
-    return 1
\ No newline at end of file
+    # The release watcher assigns the metric once the cluster builds the model
+    model_status.awaiting_release(model_version.id, metric_threshold=1.0 - outlier_detector.contamination)
+    model_status.start_stage("build_monitoring_model")
+    save_job_status(model_status)
+    logging.info("Uploaded an outlier detector with modelversion_id=%d for modelversion_id=%d",
+                 model_version.id, monitored_model.id)
+    return 1
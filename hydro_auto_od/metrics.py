@@ -0,0 +1,113 @@
+import logging
+import resource
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+from pymongo import monitoring
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, in MiB"""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak_rss / 2 ** 20 if sys.platform == "darwin" else peak_rss / 2 ** 10
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text format. Summaries are observed by the code
+    being measured, gauges are callables evaluated on every scrape.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._summaries: Dict[str, Dict[Labels, List[float]]] = {}
+        self._gauges: Dict[str, Dict[Labels, Callable[[], float]]] = {}
+
+    def summary(self, name: str, help: str) -> None:
+        self._help[name] = ("summary", help)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            count_and_sum = self._summaries.setdefault(name, {}).setdefault(key, [0, 0.])
+            count_and_sum[0] += 1
+            count_and_sum[1] += value
+
+    def gauge(self, name: str, help: str, function: Callable[[], float], **labels: str) -> None:
+        self._help[name] = ("gauge", help)
+        self._gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = function
+
+    @staticmethod
+    def _format_labels(labels: Labels) -> str:
+        if not labels:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help) in sorted(self._help.items()):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "summary":
+                with self._lock:
+                    series = [(labels, tuple(count_and_sum)) for labels, count_and_sum in
+                              self._summaries.get(name, {}).items()]
+                for labels, (count, total) in series:
+                    lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+                    lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            else:
+                for labels, function in list(self._gauges.get(name, {}).items()):
+                    try:
+                        value = function()
+                    except Exception as e:
+                        logging.warning("Failed to collect metric %s: %s", name, e)
+                        continue
+                    lines.append(f"{name}{self._format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.summary("auto_od_mongo_command_duration_seconds", "Latency of MongoDB commands sent by this process")
+
+
+class MongoLatencyListener(monitoring.CommandListener):
+    """Records latency of every MongoDB command sent by a client it is registered with"""
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        metrics.observe("auto_od_mongo_command_duration_seconds", event.duration_micros / 1e6,
+                        command=event.command_name, outcome="success")
+
+    def failed(self, event):
+        metrics.observe("auto_od_mongo_command_duration_seconds", event.duration_micros / 1e6,
+                        command=event.command_name, outcome="failure")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("Metrics endpoint: " + format, *args)
+
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """Serves metrics at http://0.0.0.0:port/metrics from a daemon thread"""
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
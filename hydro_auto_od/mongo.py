@@ -0,0 +1,39 @@
+import os
+import threading
+from typing import Optional
+
+from pymongo import MongoClient
+from pymongo.database import Database
+from hydro_auto_od.config import config
+from hydro_auto_od.metrics import MongoLatencyListener
+
+
+_client: Optional[MongoClient] = None
+_client_lock = threading.Lock()
+
+
+def get_database() -> Database:
+    """
+    Returns the service database using one MongoClient per process.
+    The client is created lazily and reused, so its connection pool is shared by all storages.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(host=config.mongo_url, port=config.mongo_port,
+                                      username=config.mongo_user, password=config.mongo_pass,
+                                      authSource=config.mongo_auth_db, connect=False,
+                                      event_listeners=[MongoLatencyListener()])
+    return _client[config.mongo_db]
+
+
+def _reset_after_fork() -> None:
+    # MongoClient is not fork-safe, so a forked process drops the inherited one
+    # and lazily connects with its own client on first use
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
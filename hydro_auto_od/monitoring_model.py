@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+from shutil import copyfile, copytree, ignore_patterns
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+from pyod.models.base import BaseDetector
+
+from hydro_auto_od.config import config
+from hydro_auto_od.scorer import save_scorer
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "resources", "monitoring_model_template")
+TEMPLATE_REQUIREMENTS_PATH = os.path.join(TEMPLATE_PATH, "requirements.txt")
+SCORER_REQUIREMENTS_PATH = os.path.join(os.path.dirname(__file__), "resources", "scorer_requirements.txt")
+INSTALL_COMMAND = "pip install -r requirements.txt"
+
+
+def write_monitoring_model(folder_path: str, outlier_detector: BaseDetector, field_names: List[str],
+                           categorical_codes: Optional[Dict[str, list]] = None) -> None:
+    """
+    Copies the monitoring model template into folder_path, which must not exist yet,
+    and saves the fitted outlier detector and field configuration used by func_main.py next to it
+    :param categorical_codes: categories of categorical fields in code order, see categorical.encode_categorical
+    """
+    copytree(TEMPLATE_PATH, folder_path, ignore=ignore_patterns("__pycache__"))
+    joblib.dump(outlier_detector, f'{folder_path}/outlier_detector.joblib')
+    scorer_exported = save_scorer(outlier_detector, f'{folder_path}/scorer.npz')
+
+    # Save names and dtypes of analysed model fields to use in handling new requests in func_main.py
+    monitoring_model_config = {"field_names": field_names}
+    with open(f"{folder_path}/fields_config.json", "w+") as fields_config_file:
+        json.dump(monitoring_model_config, fields_config_file)
+
+    if categorical_codes:
+        with open(f"{folder_path}/categorical_codes.json", "w+") as codes_file:
+            json.dump(categorical_codes, codes_file)
+
+    if scorer_exported:
+        # NumPy scorer does not need pyod, sklearn and pandas to be installed
+        copyfile(SCORER_REQUIREMENTS_PATH, f"{folder_path}/requirements.txt")
+
+
+def _normalize_name(name: str) -> str:
+    return name.strip().lower().replace("_", "-")
+
+
+def parse_requirements(lines: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Parses requirements pinned with == or not pinned at all, skipping comments.
+    :return: pinned version of every package, None for packages without a version
+    :raises ValueError: for requirements in any other form
+    """
+    requirements = {}
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        name, separator, version = line.partition("==")
+        if not name or any(character in name + version for character in "<>=!~;[@ "):
+            raise ValueError(f"Requirement '{line}' is not pinned with ==")
+        requirements[_normalize_name(name)] = version.strip() if separator else None
+    return requirements
+
+
+def prebuilt_runtime_packages() -> Dict[str, Optional[str]]:
+    """
+    Packages installed in config.prebuilt_runtime, comma separated name==version pairs of
+    PREBUILT_RUNTIME_PACKAGES, by default the requirements installed by Dockerfile.runtime
+    """
+    if config.prebuilt_runtime_packages is not None:
+        return parse_requirements(config.prebuilt_runtime_packages.split(","))
+    lines = []
+    for path in (TEMPLATE_REQUIREMENTS_PATH, SCORER_REQUIREMENTS_PATH):
+        with open(path) as requirements_file:
+            lines += requirements_file.readlines()
+    return parse_requirements(lines)
+
+
+def select_runtime(folder_path: str) -> Tuple[str, Optional[str]]:
+    """
+    Chooses the runtime image for a monitoring model written by write_monitoring_model.
+    The prebuilt runtime is used when it has every requirement of the model installed,
+    so that the model is built without installing anything.
+    :return: runtime image and install command, None if nothing has to be installed
+    """
+    if config.prebuilt_runtime is not None:
+        with open(os.path.join(folder_path, "requirements.txt")) as requirements_file:
+            requirement_lines = requirements_file.readlines()
+        try:
+            requirements = parse_requirements(requirement_lines)
+            packages = prebuilt_runtime_packages()
+        except ValueError as e:
+            logging.warning("Installing requirements of the monitoring model in %s: %s", config.default_runtime, e)
+            return config.default_runtime, INSTALL_COMMAND
+        if all(name in packages and (version is None or packages[name] == version)
+               for name, version in requirements.items()):
+            return config.prebuilt_runtime, None
+    return config.default_runtime, INSTALL_COMMAND
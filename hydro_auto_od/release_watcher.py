@@ -0,0 +1,104 @@
+import datetime
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable
+
+from hydro_auto_od.metrics import metrics
+from hydro_auto_od.training_status_storage import TrainingStatusStorage, TrainingStatus
+
+if TYPE_CHECKING:
+    from hydrosdk.cluster import Cluster
+    from hydrosdk.modelversion import ModelVersion
+
+metrics.summary("auto_od_monitoring_model_build_duration_seconds",
+                "Time from upload until the cluster built a monitoring model, by runtime image and build status")
+
+
+class ReleaseWatcher:
+    """
+    Waits for monitoring models uploaded by training jobs to be built by the cluster.
+
+    Training jobs finish right after the upload and leave their status in DEPLOYING,
+    so one thread polls the builds of all of them with a single request per poll.
+    Released models are passed to on_release, failed and timed out ones fail their job.
+    The cluster client is taken from get_cluster on the first poll with jobs awaiting release.
+    """
+    def __init__(self, get_cluster: Callable[[], "Cluster"],
+                 on_release: Callable[[TrainingStatus, "ModelVersion"], None],
+                 poll_interval: float, timeout: float):
+        self.get_cluster = get_cluster
+        self.on_release = on_release
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="release-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._poll()
+            except Exception:
+                logging.exception("Release watcher iteration failed")
+            self._stopped.wait(self.poll_interval)
+
+    def _poll(self) -> None:
+        awaiting_release = TrainingStatusStorage.find_awaiting_release()
+        if not awaiting_release:
+            return
+        from hydrosdk.modelversion import ModelVersion, ModelVersionStatus
+        model_versions = {model_version.id: model_version for model_version in ModelVersion.list(self.get_cluster())}
+        now = datetime.datetime.utcnow()
+        for model_status in awaiting_release:
+            model_version = model_versions.get(model_status.pending_metric_model_version_id)
+            build_status = model_version.status if model_version is not None else None
+            if build_status is ModelVersionStatus.Released:
+                if TrainingStatusStorage.claim_release(model_status):
+                    self._observe_build(model_status, model_version, now)
+                    self._release(model_status, model_version)
+            elif build_status is ModelVersionStatus.Failed:
+                logging.error("Outlier detector with modelversion_id=%d failed to build for the base model "
+                              "with modelversion_id=%d", model_version.id, model_status.model_version_id)
+                if self._fail(model_status, "Monitoring model failed to build"):
+                    self._observe_build(model_status, model_version, now)
+            elif (now - model_status.deploy_started_at).total_seconds() > self.timeout:
+                logging.error("Timed out waiting for the outlier detector with modelversion_id=%s to build for "
+                              "the base model with modelversion_id=%d",
+                              model_status.pending_metric_model_version_id, model_status.model_version_id)
+                self._fail(model_status, "Monitoring model timed out during model build")
+
+    def _release(self, model_status: TrainingStatus, model_version: "ModelVersion") -> None:
+        model_status.start_stage("assign_metric")
+        TrainingStatusStorage.save_status(model_status)
+        try:
+            self.on_release(model_status, model_version)
+        except Exception as e:
+            logging.exception("Error occurred while assigning monitoring metric for modelversion_id=%d",
+                              model_status.model_version_id)
+            model_status.failing(f"Failed to assign monitoring metrics to the model due to: {e}")
+            TrainingStatusStorage.save_status(model_status)
+
+    @staticmethod
+    def _observe_build(model_status: TrainingStatus, model_version: "ModelVersion", now: datetime.datetime) -> None:
+        duration = (now - model_status.deploy_started_at).total_seconds()
+        logging.info("Monitoring model modelversion_id=%d was built in %.1fs with status %s",
+                     model_version.id, duration, model_version.status.name)
+        metrics.observe("auto_od_monitoring_model_build_duration_seconds", duration,
+                        runtime=str(model_version.runtime), status=model_version.status.name)
+
+    @staticmethod
+    def _fail(model_status: TrainingStatus, description: str) -> bool:
+        """:return: whether this watcher failed the job, and not another one"""
+        if not TrainingStatusStorage.claim_release(model_status):
+            return False
+        model_status.failing(description)
+        TrainingStatusStorage.save_status(model_status)
+        return True
@@ -1,32 +1,60 @@
 import json
-import joblib
+import os
+import sys
 from os import path
-import pandas as pd
+import numpy as np
 
-encoder = False
+sys.path.append(path.dirname(path.abspath(__file__)))
+from od_scorer import load_scorer
 
-with open("/model/files/outlier_detector.joblib", "rb") as fp:
-    od_model = joblib.load(fp)
+# Directory with the model files, overridden to load the model outside of the serving image
+MODEL_FILES = os.environ.get("MODEL_FILES_PATH", "/model/files")
 
-with open("/model/files/fields_config.json", "r") as fp:
+if path.exists(path.join(MODEL_FILES, "scorer.npz")):
+    # Precompiled NumPy-only scorer, avoids importing pyod and sklearn
+    od_model = load_scorer(path.join(MODEL_FILES, "scorer.npz"))
+else:
+    import joblib
+    with open(path.join(MODEL_FILES, "outlier_detector.joblib"), "rb") as fp:
+        od_model = joblib.load(fp)
+
+with open(path.join(MODEL_FILES, "fields_config.json"), "r") as fp:
     config = json.load(fp)
 
-if path.exists('/model/files/categorical_encoder.joblib'):
+FIELDS = config["field_names"]
 
-    with open("/model/files/categorical_encoder.joblib", "rb") as fp:
-        categorical_encoder = joblib.load(fp)
-    with open("/model/files/categorical_features.json", "r") as fp:
-        cat_features = json.load(fp)
-    cat_fields = cat_features["categorical_features"]
-    encoder = True
+# Lookup tables from category to its code, computed once at load time.
+# Categories unseen in training get the code reserved for them, one past the last category
+CATEGORY_CODES = {}
+if path.exists(path.join(MODEL_FILES, "categorical_codes.json")):
+    with open(path.join(MODEL_FILES, "categorical_codes.json"), "r") as fp:
+        for field, categories in json.load(fp).items():
+            CATEGORY_CODES[field] = {category: code for code, category in enumerate(categories)}
 
-FIELDS = config["field_names"]
 
-def predict(**kwargs):
+def _encode(column, codes):
+    unseen_code = len(codes)
+    return [codes.get(value.decode() if isinstance(value, bytes) else value, unseen_code) for value in column]
 
-    x = pd.DataFrame.from_dict([kwargs])[FIELDS]
-    if encoder:
-        x[cat_fields] = categorical_encoder.transform(x[cat_fields])
-    score = od_model.predict_proba(x, method='unify')[:,1]
 
-    return {"value": score.item()}
+def _score(columns):
+    n_rows = max(len(column) for column in columns)
+    x = np.empty((n_rows, len(FIELDS)), dtype=np.float64)
+    for i, (field, column) in enumerate(zip(FIELDS, columns)):
+        x[:, i] = _encode(column, CATEGORY_CODES[field]) if field in CATEGORY_CODES else column
+    return od_model.predict_proba(x, method='unify')[:, 1]
+
+
+def predict(**kwargs):
+    """Scores one row given as scalars, as declared by the signature of the monitoring model"""
+    columns = [np.asarray(kwargs[field]).reshape(1) for field in FIELDS]
+    return {"value": _score(columns).item()}
+
+
+def predict_batch(**kwargs):
+    """
+    Scores N rows given as equally sized 1-D arrays, scalars are broadcast over the batch.
+    It is not a part of the model signature, but scores data in bulk when this module is imported directly.
+    """
+    columns = [np.asarray(kwargs[field]).reshape(-1) for field in FIELDS]
+    return {"value": _score(columns)}
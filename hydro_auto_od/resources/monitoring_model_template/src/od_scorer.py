@@ -0,0 +1,125 @@
+"""
+NumPy-only re-implementation of the decision functions of the PyOD detectors
+selected by hydro_auto_od. Model state is exported into scorer.npz by
+hydro_auto_od.scorer at training time.
+"""
+import abc
+import math
+import numpy as np
+
+_erf = np.frompyfunc(math.erf, 1, 1)
+
+# Caps the size of the (batch x training rows) distance matrix computed by LOF at once
+_LOF_MAX_DISTANCES = 2 ** 22
+
+
+class Scorer(abc.ABC):
+    def __init__(self, state):
+        self.mu = float(state["mu"])
+        self.sigma = float(state["sigma"])
+
+    @abc.abstractmethod
+    def decision_function(self, X):
+        pass
+
+    def predict_proba(self, X, method='unify'):
+        if method != 'unify':
+            raise ValueError(method, 'is not a supported probability conversion method')
+        X = np.asarray(X, dtype=np.float64)
+        pre_erf_score = (self.decision_function(X) - self.mu) / (self.sigma * np.sqrt(2))
+        probs = np.zeros([X.shape[0], 2])
+        probs[:, 1] = _erf(pre_erf_score).astype(np.float64).clip(0, 1)
+        probs[:, 0] = 1 - probs[:, 1]
+        return probs
+
+
+class IForestScorer(Scorer):
+    """All trees are packed into flat node arrays and traversed by the whole batch at once"""
+    def __init__(self, state):
+        super().__init__(state)
+        self.roots = state["roots"]
+        self.children_left = state["children_left"]
+        self.children_right = state["children_right"]
+        self.feature = state["feature"]
+        self.threshold = state["threshold"]
+        self.path_length = state["path_length"]
+        self.max_depth = int(state["max_depth"])
+        self.denominator = float(state["denominator"])
+        self.offset = float(state["offset"])
+
+    def decision_function(self, X):
+        # Trees compare features in float32, as sklearn does
+        X = X.astype(np.float32)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        depths = self.path_length[nodes].sum(axis=1)
+        return 2 ** (-depths / self.denominator) + self.offset
+
+
+class LOFScorer(Scorer):
+    def __init__(self, state):
+        super().__init__(state)
+        self.fit_X = state["fit_X"]
+        self.fit_X_sq_norms = (self.fit_X ** 2).sum(axis=1)
+        self.k_distance = state["k_distance"]
+        self.lrd = state["lrd"]
+        self.n_neighbors = int(state["n_neighbors"])
+
+    def _kneighbors(self, X):
+        sq_distances = (X ** 2).sum(axis=1)[:, np.newaxis] + self.fit_X_sq_norms - 2 * X @ self.fit_X.T
+        neighbors = np.argpartition(sq_distances, self.n_neighbors - 1, axis=1)[:, :self.n_neighbors]
+        distances = np.sqrt(np.maximum(np.take_along_axis(sq_distances, neighbors, axis=1), 0))
+        return distances, neighbors
+
+    def decision_function(self, X):
+        batch_size = max(1, _LOF_MAX_DISTANCES // len(self.fit_X))
+        scores = []
+        for start in range(0, X.shape[0], batch_size):
+            distances, neighbors = self._kneighbors(X[start:start + batch_size])
+            reach_distances = np.maximum(distances, self.k_distance[neighbors])
+            X_lrd = 1. / (np.mean(reach_distances, axis=1) + 1e-10)
+            scores.append(np.mean(self.lrd[neighbors] / X_lrd[:, np.newaxis], axis=1))
+        return np.concatenate(scores)
+
+
+class OCSVMScorer(Scorer):
+    def __init__(self, state):
+        super().__init__(state)
+        self.support_vectors = state["support_vectors"]
+        self.dual_coef = state["dual_coef"]
+        self.intercept = float(state["intercept"])
+        self.kernel = str(state["kernel"])
+        self.gamma = float(state["gamma"])
+        self.coef0 = float(state["coef0"])
+        self.degree = int(state["degree"])
+
+    def _kernel(self, X):
+        if self.kernel == 'rbf':
+            sq_distances = ((X ** 2).sum(axis=1)[:, np.newaxis] + (self.support_vectors ** 2).sum(axis=1)
+                            - 2 * X @ self.support_vectors.T)
+            return np.exp(-self.gamma * np.maximum(sq_distances, 0))
+        products = X @ self.support_vectors.T
+        if self.kernel == 'linear':
+            return products
+        if self.kernel == 'poly':
+            return (self.gamma * products + self.coef0) ** self.degree
+        return np.tanh(self.gamma * products + self.coef0)
+
+    def decision_function(self, X):
+        return -(self._kernel(X) @ self.dual_coef + self.intercept)
+
+
+SCORERS = {
+    'IForest': IForestScorer,
+    'LOF': LOFScorer,
+    'OCSVM': OCSVMScorer,
+}
+
+
+def load_scorer(path):
+    with np.load(path, allow_pickle=False) as state:
+        state = dict(state)
+    return SCORERS[str(state["kind"])](state)
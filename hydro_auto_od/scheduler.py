@@ -0,0 +1,160 @@
+import logging
+import os
+import socket
+import threading
+import time
+from multiprocessing import Process
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hydro_auto_od.metrics import metrics
+from hydro_auto_od.training_status_storage import TrainingStatusStorage
+
+metrics.summary("auto_od_training_job_duration_seconds", "Duration of finished training job processes by final state")
+metrics.summary("auto_od_training_stage_duration_seconds", "Duration of stages of finished training jobs")
+
+
+class TrainingJobScheduler:
+    """
+    Runs training jobs queued as PENDING statuses in a bounded pool of worker processes.
+
+    The queue lives in the model_statuses collection, so any number of replicas may run
+    schedulers over it. A claimed job is leased to the scheduler for lease_duration seconds
+    and the lease is renewed every heartbeat_interval while the job runs. Jobs whose leases
+    expire, because their replica stopped, are queued again and picked up by any scheduler.
+    A process whose lease was taken over that way is terminated. target gets the ids of the
+    jobs, their training data path and the worker id the jobs are leased to.
+
+    Queued jobs with the same training data, up to max_jobs_per_worker of them, run one after
+    another in the same worker process, so that the data is read once.
+    """
+    def __init__(self, target: Callable[[List[int], str, str], None], max_workers: int,
+                 job_timeout: float, poll_interval: float, max_jobs_per_worker: int = 1,
+                 lease_duration: float = 60., heartbeat_interval: float = 15., worker_id: Optional[str] = None):
+        self.target = target
+        self.max_workers = max_workers
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.lease_duration = lease_duration
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = worker_id if worker_id is not None else f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[Tuple[int, ...], Tuple[Process, float]] = {}
+        self._last_heartbeat = 0.
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        logging.info("Starting training job scheduler %s", self.worker_id)
+        self._thread = threading.Thread(target=self._run, name="training-job-scheduler", daemon=True)
+        self._thread.start()
+
+    @property
+    def running_jobs(self) -> int:
+        return sum(len(model_version_ids) for model_version_ids in self._running)
+
+    def notify(self) -> None:
+        """Wakes the scheduler up to pick newly queued jobs without waiting for the next poll"""
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._heartbeat()
+                self._reap()
+                self._requeue_expired()
+                self._launch()
+            except Exception:
+                logging.exception("Training job scheduler iteration failed")
+            self._wakeup.wait(min(self.poll_interval, self.heartbeat_interval))
+            self._wakeup.clear()
+
+    def _heartbeat(self) -> None:
+        if not self._running or time.monotonic() - self._last_heartbeat < self.heartbeat_interval:
+            return
+        model_version_ids = [model_version_id for ids in self._running for model_version_id in ids]
+        held = set(TrainingStatusStorage.renew_leases(model_version_ids, self.worker_id, self.lease_duration))
+        for model_version_ids, (process, _) in list(self._running.items()):
+            lost = [model_version_id for model_version_id in model_version_ids if model_version_id not in held]
+            if not lost:
+                continue
+            # Another worker trains these jobs now, the process would only race with it
+            logging.warning("Leases of training jobs for modelversion_ids=%s expired and were taken over "
+                            "by other workers, terminating their process", lost)
+            process.terminate()
+            process.join()
+            del self._running[model_version_ids]
+            # Jobs of the process which are still leased to this worker are queued again
+            still_held = [model_version_id for model_version_id in model_version_ids if model_version_id in held]
+            if still_held:
+                TrainingStatusStorage.requeue_leases(still_held, self.worker_id)
+                TrainingStatusStorage.release_leases(still_held, self.worker_id)
+        self._last_heartbeat = time.monotonic()
+
+    @staticmethod
+    def _requeue_expired() -> None:
+        requeued = TrainingStatusStorage.requeue_expired_leases()
+        if requeued:
+            logging.info("Re-queued %d training jobs of stopped workers", requeued)
+
+    def _reap(self) -> None:
+        for model_version_ids, (process, started_at) in list(self._running.items()):
+            failure = None
+            job_timeout = self.job_timeout * len(model_version_ids)
+            if process.is_alive():
+                if time.monotonic() - started_at < job_timeout:
+                    continue
+                logging.error("Training jobs for modelversion_ids=%s timed out, terminating them", model_version_ids)
+                process.terminate()
+                process.join()
+                failure = f"Training job timed out after {job_timeout} seconds"
+            else:
+                process.join()
+                if process.exitcode != 0:
+                    logging.error("Training jobs for modelversion_ids=%s exited with code %s",
+                                  model_version_ids, process.exitcode)
+                    failure = f"Training job exited with code {process.exitcode}"
+            del self._running[model_version_ids]
+            for model_version_id in model_version_ids:
+                self._finish(model_version_id, time.monotonic() - started_at, failure)
+            TrainingStatusStorage.release_leases(list(model_version_ids), self.worker_id)
+
+    def _launch(self) -> None:
+        while len(self._running) < self.max_workers:
+            model_status = TrainingStatusStorage.claim_next_pending(self.worker_id, self.lease_duration)
+            if model_status is None:
+                return
+            model_version_ids = [model_status.model_version_id]
+            while len(model_version_ids) < self.max_jobs_per_worker:
+                same_data_status = TrainingStatusStorage.claim_next_pending(self.worker_id, self.lease_duration,
+                                                                            model_status.training_data_path)
+                if same_data_status is None:
+                    break
+                model_version_ids.append(same_data_status.model_version_id)
+            process = Process(target=self.target,
+                              args=(model_version_ids, model_status.training_data_path, self.worker_id))
+            process.start()
+            self._running[tuple(model_version_ids)] = (process, time.monotonic())
+            logging.info("Started training jobs for modelversion_ids=%s", model_version_ids)
+
+    def _finish(self, model_version_id: int, duration: float, failure: Optional[str]) -> None:
+        """Fails the job if its process failed before finishing it and records its durations"""
+        model_status = TrainingStatusStorage.find_by_model_version_id(model_version_id)
+        if model_status is None:
+            return
+        # A job taken over by another worker after its lease expired is left to that worker,
+        # and a job whose model was uploaded is left to the release watcher
+        if failure is not None and not model_status.is_finished and model_status.lease_owner == self.worker_id \
+                and model_status.deploy_started_at is None:
+            model_status.failing(failure)
+            TrainingStatusStorage.save_status(model_status)
+        metrics.observe("auto_od_training_job_duration_seconds", duration, state=model_status.state.name)
+        for stage in model_status.stages:
+            if stage.duration is not None:
+                metrics.observe("auto_od_training_stage_duration_seconds", stage.duration, stage=stage.name)
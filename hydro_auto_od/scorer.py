@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+from pyod.models.base import BaseDetector
+from pyod.models.iforest import IForest
+from pyod.models.lof import LOF
+from pyod.models.ocsvm import OCSVM
+from sklearn.ensemble._iforest import _average_path_length
+
+
+def _iforest_state(model: IForest) -> Dict[str, np.ndarray]:
+    forest = model.detector_
+    roots, children_left, children_right, feature, threshold, path_length = [], [], [], [], [], []
+    max_depth, offset = 0, 0
+    for tree, features in zip(forest.estimators_, forest.estimators_features_):
+        tree_ = tree.tree_
+        is_leaf = tree_.children_left == -1
+        node_ids = np.arange(tree_.node_count)
+
+        # Depth of every node, parents always come before their children in sklearn trees
+        depth = np.zeros(tree_.node_count)
+        for node in node_ids[~is_leaf]:
+            depth[tree_.children_left[node]] = depth[tree_.children_right[node]] = depth[node] + 1
+
+        # Leaves point to themselves, so traversal can run a fixed number of steps
+        roots.append(offset)
+        children_left.append(np.where(is_leaf, node_ids, tree_.children_left) + offset)
+        children_right.append(np.where(is_leaf, node_ids, tree_.children_right) + offset)
+        feature.append(np.asarray(features)[np.where(is_leaf, 0, tree_.feature)])
+        threshold.append(tree_.threshold)
+        path_length.append(depth + _average_path_length(tree_.n_node_samples))
+        max_depth = max(max_depth, tree_.max_depth)
+        offset += tree_.node_count
+
+    return {
+        "roots": np.array(roots),
+        "children_left": np.concatenate(children_left),
+        "children_right": np.concatenate(children_right),
+        "feature": np.concatenate(feature),
+        "threshold": np.concatenate(threshold),
+        "path_length": np.concatenate(path_length),
+        "max_depth": np.array(max_depth),
+        "denominator": np.array(len(forest.estimators_) * _average_path_length([forest.max_samples_])[0]),
+        # pyod inverts sklearn decision_function, which is score_samples - offset_
+        "offset": np.array(forest.offset_),
+    }
+
+
+def _lof_state(model: LOF) -> Optional[Dict[str, np.ndarray]]:
+    if model.metric not in ('minkowski', 'euclidean', 'l2') or (model.metric == 'minkowski' and model.p != 2):
+        return None
+    lof = model.detector_
+    return {
+        "fit_X": lof._fit_X,
+        "k_distance": lof._distances_fit_X_[:, lof.n_neighbors_ - 1],
+        "lrd": lof._lrd,
+        "n_neighbors": np.array(lof.n_neighbors_),
+    }
+
+
+def _ocsvm_state(model: OCSVM) -> Optional[Dict[str, np.ndarray]]:
+    svm = model.detector_
+    if svm.kernel not in ('rbf', 'linear', 'poly', 'sigmoid'):
+        return None
+    return {
+        "support_vectors": svm.support_vectors_,
+        "dual_coef": svm.dual_coef_.ravel(),
+        "intercept": np.array(svm.intercept_[0]),
+        "kernel": np.array(svm.kernel),
+        "gamma": np.array(svm._gamma),
+        "coef0": np.array(svm.coef0),
+        "degree": np.array(svm.degree),
+    }
+
+
+_STATE_EXPORTERS = {
+    IForest: _iforest_state,
+    LOF: _lof_state,
+    OCSVM: _ocsvm_state,
+}
+
+
+def export_scorer(model: BaseDetector) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Extracts the minimal state needed by od_scorer from the monitoring model template
+    to evaluate model.predict_proba(X, method='unify') with NumPy alone.
+    :return: arrays to be saved into scorer.npz, None if the model is not supported
+    """
+    exporter = _STATE_EXPORTERS.get(type(model))
+    state = exporter(model) if exporter is not None else None
+    if state is None:
+        return None
+    state["kind"] = np.array(type(model).__name__)
+    state["mu"] = np.array(model._mu)
+    state["sigma"] = np.array(model._sigma)
+    return state
+
+
+def save_scorer(model: BaseDetector, path: str) -> bool:
+    state = export_scorer(model)
+    if state is None:
+        logging.info("Model %s can not be exported as a NumPy scorer", type(model).__name__)
+        return False
+    np.savez(path, **state)
+    return True
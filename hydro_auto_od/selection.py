@@ -17,14 +17,18 @@
 # 4) Contamination parameter is assigned to 4%. 
 
 
+from typing import Callable, Optional, Tuple
+
 import numpy as np
 import logging 
 import pandas as pd
+from pyod.models.base import BaseDetector
 from pyod.models.iforest import IForest
 from pyod.models.lof import LOF
 from pyod.models.ocsvm import OCSVM
 from sklearn.model_selection import train_test_split
-from hydro_auto_od.tuning import model_tuning, high_tuning, low_tuning
+from hydro_auto_od.tuning import model_tuning, high_tuning, low_tuning, TuningBudget, SubsetSamples, \
+    all_feature_subsets, draw_feature_subsets, fit_rows
 
 
 models = {'IForest': IForest, 'LOF': LOF, 'OCSVM': OCSVM}
@@ -32,31 +36,113 @@ algo_param = {
     'LOF': {'n_neighbors': np.arange(5,31)},
     'IForest': {'n_estimators': np.array([20, 50, 100, 150, 200, 250])},
 }
+selection_alphas = np.arange(0.9, 0.99, 0.001)
+tuning_alphas = np.arange(0.05, 1., 0.05)
+contamination = 0.03
 
-def model_selection(data: pd.DataFrame):
-    
-    X = np.array(data)
+
+def selection_setup() -> dict:
+    """Describes candidates and search parameters, everything that affects select_model besides data"""
+    return {
+        'models': sorted(models),
+        'algo_param': {name: {param: grid.tolist() for param, grid in grids.items()}
+                       for name, grids in algo_param.items()},
+        'selection_alphas': selection_alphas.tolist(),
+        'tuning_alphas': tuning_alphas.tolist(),
+        'contamination': contamination,
+    }
+
+
+def select_model(data: pd.DataFrame, n_jobs: int = 1, random_state=None,
+                 search: str = 'exhaustive', budget: Optional[TuningBudget] = None,
+                 approx_neighbors_rows: Optional[int] = None,
+                 on_parameter_tuning: Optional[Callable[[str], None]] = None,
+                 ocsvm_max_rows: Optional[int] = None) -> Tuple[str, dict]:
+    """
+    Runs EM-MV model selection and hyperparameter tuning.
+    :param search: 'exhaustive' or 'halving' search over candidates with up to 7 features
+    :param budget: compute budget shared by model selection and hyperparameter tuning, counts the fits spent.
+        'halving' search skips later rounds and exhaustive search skips the remaining feature subsets
+        once it is exhausted
+    :param approx_neighbors_rows: number of training rows above which LOF tuning uses an approximate
+        neighbor index, if pynndescent is installed
+    :param on_parameter_tuning: called with the name of the chosen model before its hyperparameters are tuned
+    :param ocsvm_max_rows: number of training rows OCSVM candidates are fitted on at most
+    :return: name of the chosen model in `models` and its parameters
+    """
+    X = np.array(data, dtype=np.float64)
+    budget = budget if budget is not None else TuningBudget()
     
-    x_train, x_test = train_test_split(X, test_size = 0.2)
+    x_train, x_test = train_test_split(X, test_size = 0.2, random_state=random_state)
 
-    # Evaluating each model among candidates
+    # Feature subsets and uniform samples are drawn once, hyperparameter tuning uses prefixes of them
     if X.shape[1] <= 7:
-        chosen_model = low_tuning(x_train, x_test, list(models.values()), base_estimator=None,
-                                  alphas=np.arange(0.9, 0.99, 0.001))
-    else:
-        chosen_model = high_tuning(x_train, x_test, list(models.values()), base_estimator=None,
-                                   alphas=np.arange(0.9, 0.99, 0.001), averaging=50)
-      
-    chosen_name = chosen_model.__name__
-    if chosen_name == 'OCSVM':
-        final_model = chosen_model(**{'contamination': 0.03})
+        subsets = all_feature_subsets(X.shape[1])
     else:
-        # Choosing hyperparameter
-        parameters = algo_param[chosen_name]
-        chosen_params = model_tuning(x_train, x_test, base_estimator=chosen_model,
-                                     parameters=parameters, alphas=np.arange(0.05, 1., 0.05))
-        chosen_params['contamination'] = 0.03
-        final_model= chosen_model(**chosen_params)
-
-    final_model.fit(X)
-    return final_model
+        subsets = draw_feature_subsets(x_test, 50, random_state=random_state)
+    with SubsetSamples(x_test, subsets, n_sim=100000, random_state=random_state) as samples:
+        # Evaluating each model among candidates
+        if X.shape[1] <= 7:
+            chosen_model = low_tuning(x_train, x_test, list(models.values()), base_estimator=None,
+                                      alphas=selection_alphas,
+                                      n_jobs=n_jobs, random_state=random_state, search=search, budget=budget,
+                                      samples=samples, max_fit_rows=ocsvm_max_rows)
+        else:
+            chosen_model = high_tuning(x_train, x_test, list(models.values()), base_estimator=None,
+                                       alphas=selection_alphas, averaging=50,
+                                       n_jobs=n_jobs, random_state=random_state, budget=budget,
+                                       samples=samples, max_fit_rows=ocsvm_max_rows)
+
+        chosen_name = chosen_model.__name__
+        if chosen_name == 'OCSVM':
+            chosen_params = {}
+        else:
+            # Choosing hyperparameter
+            if on_parameter_tuning is not None:
+                on_parameter_tuning(chosen_name)
+            parameters = algo_param[chosen_name]
+            chosen_params = model_tuning(x_train, x_test, base_estimator=chosen_model,
+                                         parameters=parameters, alphas=tuning_alphas,
+                                         n_jobs=n_jobs, random_state=random_state, search=search, budget=budget,
+                                         approx_rows=approx_neighbors_rows, samples=samples)
+    chosen_params['contamination'] = contamination
+    # Keep parameters as plain python values, so they can be stored along with the training status
+    chosen_params = {name: value.item() if isinstance(value, np.generic) else value
+                     for name, value in chosen_params.items()}
+    return chosen_name, chosen_params
+
+
+def build_model(name: str, params: dict, random_state=None) -> BaseDetector:
+    model = models[name](**params)
+    if 'random_state' in model.get_params():
+        model.set_params(random_state=random_state)
+    return model
+
+
+def recalibrate(model: BaseDetector, data: pd.DataFrame) -> BaseDetector:
+    """Refreshes training score statistics of a fitted model on new data without refitting it"""
+    model.decision_scores_ = model.decision_function(np.array(data, dtype=np.float64))
+    model._process_decision_scores()
+    return model
+
+
+def fit_model(model: BaseDetector, data: pd.DataFrame, max_fit_rows: Optional[int] = None,
+              random_state=None) -> BaseDetector:
+    """
+    Fits the model on data. Models with superlinear fit cost, OCSVM, are fitted on at most max_fit_rows
+    rows sampled uniformly and recalibrated on all rows, so that their threshold reflects the whole data
+    """
+    X = np.array(data, dtype=np.float64)
+    X_fit = fit_rows(model, X, max_fit_rows, random_state)
+    model.fit(X_fit)
+    if X_fit is not X:
+        recalibrate(model, X)
+    return model
+
+
+def model_selection(data: pd.DataFrame, n_jobs: int = 1, random_state=None,
+                    ocsvm_max_rows: Optional[int] = None) -> BaseDetector:
+    chosen_name, chosen_params = select_model(data, n_jobs=n_jobs, random_state=random_state,
+                                              ocsvm_max_rows=ocsvm_max_rows)
+    final_model = build_model(chosen_name, chosen_params, random_state=random_state)
+    return fit_model(final_model, data, max_fit_rows=ocsvm_max_rows, random_state=random_state)
@@ -0,0 +1,81 @@
+import datetime
+import hashlib
+import json
+import logging
+from typing import List, Optional, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+from pymongo.database import Collection
+from hydro_serving_grpc.serving.contract.field_pb2 import ModelField
+
+from hydro_auto_od.config import config
+from hydro_auto_od.mongo import get_database
+
+
+class SelectionCache:
+    """
+    Persistent cache of model selection results, keyed by training data content,
+    the signature fields used and the model selection setup.
+    Entries expire config.selection_cache_ttl seconds after they were last used, and the least
+    recently used ones are evicted above config.selection_cache_max_entries.
+    """
+    __indexes_ensured = False
+
+    @staticmethod
+    def __collection() -> Collection:
+        db = get_database()
+        if not SelectionCache.__indexes_ensured:
+            try:
+                db.selection_cache.create_index('key', unique=True)
+                db.selection_cache.create_index('accessed_at', expireAfterSeconds=config.selection_cache_ttl)
+            except PyMongoError as e:
+                logging.warning("Failed to ensure indexes on selection_cache: %s", e)
+            SelectionCache.__indexes_ensured = True
+        return db.selection_cache
+
+    @staticmethod
+    def key(data_fingerprint: str, fields: List[ModelField], setup: dict) -> str:
+        cache_key = {
+            'data': data_fingerprint,
+            'fields': sorted([field.name, field.dtype] for field in fields),
+            'setup': setup,
+        }
+        return hashlib.sha256(json.dumps(cache_key, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def __count(counter: str) -> None:
+        get_database().selection_cache_stats.update_one({'_id': 'counters'}, {'$inc': {counter: 1}}, upsert=True)
+
+    @staticmethod
+    def get(key: str) -> Optional[Tuple[str, dict]]:
+        """:return: name of the selected model and its parameters, None on a cache miss"""
+        entry = SelectionCache.__collection().find_one_and_update(
+            {'key': key},
+            {'$set': {'accessed_at': datetime.datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        SelectionCache.__count('misses' if entry is None else 'hits')
+        if entry is None:
+            return None
+        return entry['model_name'], entry['model_params']
+
+    @staticmethod
+    def put(key: str, model_name: str, model_params: dict) -> None:
+        collection = SelectionCache.__collection()
+        collection.update_one(
+            {'key': key},
+            {'$set': {'model_name': model_name, 'model_params': model_params,
+                      'accessed_at': datetime.datetime.utcnow()}},
+            upsert=True,
+        )
+        n_evicted = collection.estimated_document_count() - config.selection_cache_max_entries
+        if n_evicted > 0:
+            least_recently_used = [entry['_id'] for entry in collection.find({}, {'_id': 1})
+                                   .sort('accessed_at', ASCENDING).limit(n_evicted)]
+            collection.delete_many({'_id': {'$in': least_recently_used}})
+
+    @staticmethod
+    def stats() -> dict:
+        counters = get_database().selection_cache_stats.find_one({'_id': 'counters'}) or {}
+        return {'hits': counters.get('hits', 0), 'misses': counters.get('misses', 0)}
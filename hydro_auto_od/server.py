@@ -1,4 +1,8 @@
+import asyncio
+import importlib
+import json
 import logging
+import threading
 from logging.config import fileConfig
 from concurrent import futures
 
@@ -16,19 +20,28 @@ from grpc_health.v1.health_pb2_grpc import HealthServicer
 from grpc_health.v1.health_pb2_grpc import add_HealthServicer_to_server
 
 from hydro_auto_od.config import config
-from hydro_auto_od.main import process_auto_metric_request
-from hydro_auto_od.training_status_storage import TrainingStatusStorage
+from hydro_auto_od.metrics import metrics, start_metrics_server
+from hydro_auto_od.selection_cache import SelectionCache
+from hydro_auto_od.training_status_storage import TrainingStatusStorage, AutoODMethodStatuses
+from hydro_auto_od.workers import job_scheduler, release_watcher
 
 fileConfig("hydro_auto_od/resources/logging_config.conf")
 
+BULK_SERVICE_NAME = "hydrosphere.monitoring.auto_od.AutoOdBulkService"
+
+
+def _main():
+    # Imports hydrosdk and the ML stack on the first launch request, so that the server starts without them
+    return importlib.import_module("hydro_auto_od.main")
+
 
 class AutoODServiceServicer(AutoOdServiceServicer, HealthServicer):
     def GetModelStatus(self, request: ModelStatusRequest, context):
-        model_status = TrainingStatusStorage.find_by_model_version_id(request.model_version_id)
+        model_status = TrainingStatusStorage.find_by_model_version_id(request.model_version_id, cached=True)
         if model_status is not None:
             return ModelStatusResponse(
-                state=ModelStatusResponse.AutoODState.Value(model_status.state),
-                description=model_status.description
+                state=ModelStatusResponse.AutoODState.Value(model_status.state.name),
+                description=model_status.describe()
             )
         else:
             return ModelStatusResponse(
@@ -38,24 +51,146 @@ class AutoODServiceServicer(AutoOdServiceServicer, HealthServicer):
 
     def LaunchAutoOd(self, request: LaunchAutoOdRequest, context):
         training_data_path, model_version_id = request.training_data_path, request.model_version_id
-        state, description = process_auto_metric_request(training_data_path, model_version_id)
+        state, description = _main().process_auto_metric_request(training_data_path, model_version_id)
         return LaunchAutoOdResponse(state=state, description=description)
 
+    def LaunchAutoOdBulk(self, request: dict, context) -> dict:
+        requests = [(launch["training_data_path"], launch["model_version_id"]) for launch in request["requests"]]
+        results = _main().process_bulk_auto_metric_request(requests, priority=request.get("priority", 0))
+        return {"results": [{"model_version_id": model_version_id, "state": state, "description": description}
+                            for (_, model_version_id), (state, description) in zip(requests, results)]}
+
+    def GetModelStatusBulk(self, request: dict, context) -> dict:
+        model_version_ids = request["model_version_ids"]
+        model_statuses = TrainingStatusStorage.find_by_model_version_ids(model_version_ids)
+        statuses = []
+        for model_version_id in model_version_ids:
+            model_status = model_statuses.get(model_version_id)
+            if model_status is not None:
+                statuses.append({"model_version_id": model_version_id, "state": model_status.state.name,
+                                 "description": model_status.describe()})
+            else:
+                statuses.append({"model_version_id": model_version_id, "state": "PENDING",
+                                 "description": f"Training job for modelversion_id={model_version_id} "
+                                                f"was never requested."})
+        return {"statuses": statuses}
+
     def Check(self, request, context):
         return HealthCheckResponse(status="SERVING")
 
 
-def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=5))
+def add_bulk_handlers_to_server(servicer, server) -> None:
+    """
+    Bulk methods take and return JSON, since the service proto has no messages for them:
+    * LaunchAutoOdBulk - {"requests": [{"model_version_id": 1, "training_data_path": "s3://..."}], "priority": 0}
+    * GetModelStatusBulk - {"model_version_ids": [1, 2]}
+    """
+    method_handlers = {
+        name: grpc.unary_unary_rpc_method_handler(getattr(servicer, name),
+                                                  request_deserializer=json.loads,
+                                                  response_serializer=lambda response: json.dumps(response).encode())
+        for name in ("LaunchAutoOdBulk", "GetModelStatusBulk")
+    }
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(BULK_SERVICE_NAME, method_handlers),))
+
+
+class AsyncAutoODServiceServicer(AutoOdServiceServicer, HealthServicer):
+    """
+    Servicer for the grpc.aio server. Calls to the cluster and MongoDB block, so they run in
+    thread pools, a separate one for launches, so that a burst of them does not delay status polling.
+    Health checks never leave the event loop.
+    """
+    def __init__(self):
+        self._servicer = AutoODServiceServicer()
+        self._launch_executor = futures.ThreadPoolExecutor(max_workers=config.grpc_launch_workers,
+                                                           thread_name_prefix="launch-auto-od")
+        self._status_executor = futures.ThreadPoolExecutor(max_workers=config.grpc_status_workers,
+                                                           thread_name_prefix="get-model-status")
+
+    async def GetModelStatus(self, request: ModelStatusRequest, context):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._status_executor, self._servicer.GetModelStatus, request, context)
+
+    async def LaunchAutoOd(self, request: LaunchAutoOdRequest, context):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._launch_executor, self._servicer.LaunchAutoOd, request, context)
+
+    async def LaunchAutoOdBulk(self, request: dict, context) -> dict:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._launch_executor, self._servicer.LaunchAutoOdBulk, request, context)
+
+    async def GetModelStatusBulk(self, request: dict, context) -> dict:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._status_executor, self._servicer.GetModelStatusBulk, request, context)
+
+    async def Check(self, request, context):
+        return HealthCheckResponse(status="SERVING")
+
+
+def start_background_services():
+    """Starts training workers unless the service only serves the API, and the metrics server"""
+    if config.service_mode != "api":
+        job_scheduler.start()
+        release_watcher.start()
+    if config.metrics_port:
+        metrics.gauge("auto_od_training_jobs_queued", "Training jobs waiting in the queue",
+                      lambda: TrainingStatusStorage.count_by_state(AutoODMethodStatuses.PENDING))
+        if config.service_mode != "api":
+            metrics.gauge("auto_od_training_jobs_running", "Training jobs running in worker processes of this replica",
+                          lambda: job_scheduler.running_jobs)
+        for result, counter in (("hit", "hits"), ("miss", "misses")):
+            metrics.gauge("auto_od_selection_cache_lookups", "Model selection cache lookups of all replicas by result",
+                          lambda counter=counter: SelectionCache.stats()[counter], result=result)
+        start_metrics_server(config.metrics_port)
+        logging.info(f"Metrics are served at 0.0.0.0:{config.metrics_port}/metrics")
+
+
+def serve_threads():
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=config.grpc_max_workers))
     servicer = AutoODServiceServicer()
     add_AutoOdServiceServicer_to_server(servicer, server)
+    add_bulk_handlers_to_server(servicer, server)
     add_HealthServicer_to_server(servicer, server)
     server.add_insecure_port(f'[::]:{config.grpc_port}')
     server.start()
     logging.info(f"Server started at [::]:{config.grpc_port}")
+    start_background_services()
     server.wait_for_termination()
 
 
+async def serve_asyncio():
+    server = grpc.aio.server()
+    servicer = AsyncAutoODServiceServicer()
+    add_AutoOdServiceServicer_to_server(servicer, server)
+    add_bulk_handlers_to_server(servicer, server)
+    add_HealthServicer_to_server(servicer, server)
+    server.add_insecure_port(f'[::]:{config.grpc_port}')
+    await server.start()
+    logging.info(f"Asyncio server started at [::]:{config.grpc_port}")
+    start_background_services()
+    await server.wait_for_termination()
+
+
+def serve_worker():
+    """
+    Runs training jobs queued by API replicas, without serving gRPC. Unlike the API, the worker
+    imports the ML stack before it starts, so that training job processes inherit it.
+    """
+    _main()
+    start_background_services()
+    logging.info("Worker started")
+    threading.Event().wait()
+
+
+def serve():
+    if config.service_mode == "worker":
+        serve_worker()
+    elif config.grpc_server_mode == "asyncio":
+        asyncio.run(serve_asyncio())
+    else:
+        serve_threads()
+
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
     serve()
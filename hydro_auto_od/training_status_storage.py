@@ -1,10 +1,19 @@
-from dataclasses import dataclass
+import datetime
+import io
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from pymongo import MongoClient
+import gridfs
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
 from pymongo.database import Database, Collection
 from hydro_auto_od.config import config
+from hydro_auto_od.metrics import peak_rss_mb
+from hydro_auto_od.mongo import get_database
 
 
 class AutoODMethodStatuses(Enum):
@@ -18,6 +27,42 @@ class AutoODMethodStatuses(Enum):
     NOT_SUPPORTED = 7
 
 
+# States of jobs which are being trained by a worker process
+TRAINING_STATES = [AutoODMethodStatuses.STARTED, AutoODMethodStatuses.SELECTING_MODEL,
+                   AutoODMethodStatuses.SELECTING_PARAMETERS]
+
+
+@dataclass
+class StageSpan:
+    """Timing and resource usage of one stage of a training job"""
+    name: str
+    started_at: datetime.datetime
+    finished_at: Optional[datetime.datetime] = None
+    rows: Optional[int] = None
+    fits: Optional[int] = None
+    # Peak memory of the training job process so far, including earlier stages
+    peak_rss_mb: Optional[float] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+    def describe(self) -> str:
+        if self.finished_at is None:
+            elapsed = (datetime.datetime.utcnow() - self.started_at).total_seconds()
+            return f"{self.name} running for {elapsed:.1f}s"
+        details = [f"{self.duration:.1f}s"]
+        if self.rows is not None:
+            details.append(f"{self.rows} rows")
+        if self.fits is not None:
+            details.append(f"{self.fits} fits")
+        if self.peak_rss_mb is not None:
+            details.append(f"peak {self.peak_rss_mb:.0f} MiB")
+        return f"{self.name} {', '.join(details)}"
+
+
 @dataclass
 class TrainingStatus:
     """Class for keeping statutes of training jobs"""
@@ -25,8 +70,36 @@ class TrainingStatus:
     training_data_path: str
     state: AutoODMethodStatuses
     description: Optional[str]
+    priority: int = 0
+    created_at: datetime.datetime = field(default_factory=datetime.datetime.utcnow)
+    # Selected estimator family from selection.models and its parameters, reused on retraining
+    model_name: Optional[str] = None
+    model_params: Optional[dict] = None
+    metric_model_version_id: Optional[int] = None
+    stages: List[StageSpan] = field(default_factory=list)
+    # Uploaded monitoring model which replaces metric_model_version_id once it is released
+    pending_metric_model_version_id: Optional[int] = None
+    metric_threshold: Optional[float] = None
+    deploy_started_at: Optional[datetime.datetime] = None
+    # Worker training the job and the time until which it holds it, changed only by
+    # the lease methods of TrainingStatusStorage and never written by save_status
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime.datetime] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in (AutoODMethodStatuses.SUCCESS, AutoODMethodStatuses.FAILED,
+                              AutoODMethodStatuses.NOT_SUPPORTED)
+
+    def starting(self, description: str) -> None:
+        self.state = AutoODMethodStatuses.STARTED
+        self.description = description
+        self.stages = []
+        self.pending_metric_model_version_id = None
+        self.deploy_started_at = None
 
     def failing(self, description: str) -> None:
+        self.finish_stage()
         self.state = AutoODMethodStatuses.FAILED
         self.description = description
 
@@ -34,48 +107,327 @@ class TrainingStatus:
         self.state = AutoODMethodStatuses.DEPLOYING
         self.description = description
 
+    def awaiting_release(self, metric_model_version_id: int, metric_threshold: float) -> None:
+        self.state = AutoODMethodStatuses.DEPLOYING
+        self.description = f"Waiting for the monitoring model modelversion_id={metric_model_version_id} to build"
+        self.pending_metric_model_version_id = metric_model_version_id
+        self.metric_threshold = metric_threshold
+        self.deploy_started_at = datetime.datetime.utcnow()
+
     def success(self) -> None:
+        self.finish_stage()
         self.state = AutoODMethodStatuses.SUCCESS
         self.description = "😃"
 
+    def start_stage(self, name: str, state: Optional[AutoODMethodStatuses] = None,
+                    description: Optional[str] = None) -> None:
+        """Finishes the running stage, if any, and starts a new one, optionally moving to another state"""
+        self.finish_stage()
+        if state is not None:
+            self.state = state
+            self.description = description
+        self.stages.append(StageSpan(name=name, started_at=datetime.datetime.utcnow()))
+
+    def finish_stage(self, rows: Optional[int] = None, fits: Optional[int] = None) -> None:
+        if not self.stages or self.stages[-1].finished_at is not None:
+            return
+        stage = self.stages[-1]
+        stage.finished_at = datetime.datetime.utcnow()
+        stage.rows = rows
+        stage.fits = fits
+        stage.peak_rss_mb = peak_rss_mb()
+
+    def describe(self) -> str:
+        """Description followed by the stages of the training job"""
+        if not self.stages:
+            return self.description
+        stages = "; ".join(stage.describe() for stage in self.stages)
+        return f"{self.description}\nStages: {stages}"
+
 
 class TrainingStatusStorage:
     """Working with database to store training statuses"""
+    __indexes_ensured = False
+    __status_cache: Dict[int, Tuple[float, Optional[TrainingStatus]]] = {}
+    __STATUS_CACHE_MAX_SIZE = 10000
+
+    @staticmethod
+    def _reset_after_fork() -> None:
+        TrainingStatusStorage.__status_cache = {}
+
     @staticmethod
-    def __get_mongo_client():
-        return MongoClient(host=config.mongo_url, port=config.mongo_port,
-                           username=config.mongo_user, password=config.mongo_pass,
-                           authSource=config.mongo_auth_db)
+    def __ensure_indexes(db: Database) -> None:
+        try:
+            db.model_statuses.create_index('model_version_id', unique=True)
+            db.model_statuses.create_index([('status', ASCENDING), ('priority', DESCENDING), ('created_at', ASCENDING)])
+        except PyMongoError as e:
+            logging.warning("Failed to ensure indexes on model_statuses: %s", e)
+        TrainingStatusStorage.__indexes_ensured = True
 
     @staticmethod
     def __db() -> Database:
-        return TrainingStatusStorage.__get_mongo_client()[config.mongo_db]
+        db = get_database()
+        if not TrainingStatusStorage.__indexes_ensured:
+            TrainingStatusStorage.__ensure_indexes(db)
+        return db
 
     @staticmethod
     def __collection() -> Collection:
         return TrainingStatusStorage.__db().model_statuses
 
     @staticmethod
-    def find_by_model_version_id(model_version_id: int) -> Optional[TrainingStatus]:
-        status_document = TrainingStatusStorage.__collection().find_one({'model_version_id': model_version_id})
-        if status_document is None:
-            return None
+    def __from_document(status_document: dict) -> TrainingStatus:
         return TrainingStatus(
             model_version_id=status_document.get("model_version_id"),
             training_data_path=status_document.get("training_data_path"),
             state=AutoODMethodStatuses(status_document.get("status")),
             description=status_document.get("description"),
+            priority=status_document.get("priority", 0),
+            created_at=status_document.get("created_at"),
+            model_name=status_document.get("model_name"),
+            model_params=status_document.get("model_params"),
+            metric_model_version_id=status_document.get("metric_model_version_id"),
+            stages=[StageSpan(**stage) for stage in status_document.get("stages", [])],
+            pending_metric_model_version_id=status_document.get("pending_metric_model_version_id"),
+            metric_threshold=status_document.get("metric_threshold"),
+            deploy_started_at=status_document.get("deploy_started_at"),
+            lease_owner=status_document.get("lease_owner"),
+            lease_expires_at=status_document.get("lease_expires_at"),
+        )
+
+    @staticmethod
+    def find_by_model_version_id(model_version_id: int, cached: bool = False) -> Optional[TrainingStatus]:
+        """
+        :param cached: allow answering from a per-process read cache which is at most
+            config.status_cache_ttl seconds old. Meant for status polling only.
+        """
+        if cached:
+            cache_entry = TrainingStatusStorage.__status_cache.get(model_version_id)
+            if cache_entry is not None and cache_entry[0] > time.monotonic():
+                return cache_entry[1]
+        status_document = TrainingStatusStorage.__collection().find_one({'model_version_id': model_version_id})
+        model_status = None if status_document is None else TrainingStatusStorage.__from_document(status_document)
+        if cached and config.status_cache_ttl > 0:
+            TrainingStatusStorage.__cache_status(model_version_id, model_status)
+        return model_status
+
+    @staticmethod
+    def find_by_model_version_ids(model_version_ids: List[int]) -> Dict[int, TrainingStatus]:
+        """Statuses of many training jobs with a single query, jobs which were never requested are missing"""
+        status_documents = TrainingStatusStorage.__collection().find({'model_version_id': {'$in': model_version_ids}})
+        model_statuses = map(TrainingStatusStorage.__from_document, status_documents)
+        return {model_status.model_version_id: model_status for model_status in model_statuses}
+
+    @staticmethod
+    def __cache_status(model_version_id: int, model_status: Optional[TrainingStatus]) -> None:
+        now = time.monotonic()
+        status_cache = TrainingStatusStorage.__status_cache
+        if len(status_cache) >= TrainingStatusStorage.__STATUS_CACHE_MAX_SIZE:
+            for expired_id in [key for key, (expires_at, _) in status_cache.items() if expires_at <= now]:
+                status_cache.pop(expired_id, None)
+            if len(status_cache) >= TrainingStatusStorage.__STATUS_CACHE_MAX_SIZE:
+                status_cache.clear()
+        status_cache[model_version_id] = (now + config.status_cache_ttl, model_status)
+
+    @staticmethod
+    def claim_next_pending(lease_owner: str, lease_duration: float,
+                           training_data_path: Optional[str] = None) -> Optional[TrainingStatus]:
+        """
+        Atomically moves the oldest PENDING job with the highest priority to STARTED
+        and leases it to lease_owner for lease_duration seconds
+        :param training_data_path: claim only jobs training on this data
+        """
+        query = {'status': AutoODMethodStatuses.PENDING.value}
+        if training_data_path is not None:
+            query['training_data_path'] = training_data_path
+        status_document = TrainingStatusStorage.__collection().find_one_and_update(
+            query,
+            {'$set': {'status': AutoODMethodStatuses.STARTED.value,
+                      'description': "Training job is scheduled to start",
+                      'lease_owner': lease_owner,
+                      'lease_expires_at': datetime.datetime.utcnow() + datetime.timedelta(seconds=lease_duration)}},
+            sort=[('priority', DESCENDING), ('created_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if status_document is None:
+            return None
+        return TrainingStatusStorage.__from_document(status_document)
+
+    @staticmethod
+    def renew_leases(model_version_ids: List[int], lease_owner: str, lease_duration: float) -> List[int]:
+        """
+        Extends leases of jobs held by lease_owner
+        :return: ids of jobs whose leases are still held, others were taken over after they expired
+        """
+        query = {'model_version_id': {'$in': model_version_ids}, 'lease_owner': lease_owner}
+        collection = TrainingStatusStorage.__collection()
+        collection.update_many(
+            query,
+            {'$set': {'lease_expires_at': datetime.datetime.utcnow() + datetime.timedelta(seconds=lease_duration)}},
         )
+        return [status_document['model_version_id']
+                for status_document in collection.find(query, {'model_version_id': True})]
+
+    @staticmethod
+    def release_leases(model_version_ids: List[int], lease_owner: str) -> None:
+        TrainingStatusStorage.__collection().update_many(
+            {'model_version_id': {'$in': model_version_ids}, 'lease_owner': lease_owner},
+            {'$set': {'lease_owner': None, 'lease_expires_at': None}},
+        )
+
+    @staticmethod
+    def __worker_owned_query() -> dict:
+        """Jobs in training states, or uploading a monitoring model which the release watcher does not track yet"""
+        return {'status': {'$in': [state.value for state in TRAINING_STATES + [AutoODMethodStatuses.DEPLOYING]]},
+                'deploy_started_at': None}
+
+    @staticmethod
+    def requeue_leases(model_version_ids: List[int], lease_owner: str) -> int:
+        """
+        Moves jobs held by lease_owner whose worker process was stopped before it
+        finished them or handed them to the release watcher back to PENDING
+        """
+        result = TrainingStatusStorage.__collection().update_many(
+            dict(TrainingStatusStorage.__worker_owned_query(),
+                 model_version_id={'$in': model_version_ids}, lease_owner=lease_owner),
+            {'$set': {'status': AutoODMethodStatuses.PENDING.value,
+                      'description': "Training job was stopped and is queued again",
+                      'lease_owner': None,
+                      'lease_expires_at': None}},
+        )
+        for model_version_id in model_version_ids:
+            TrainingStatusStorage.__status_cache.pop(model_version_id, None)
+        return result.modified_count
+
+    @staticmethod
+    def requeue_expired_leases() -> int:
+        """
+        Moves jobs whose worker stopped renewing their lease before it finished them or handed them
+        to the release watcher back to PENDING. Such jobs without a lease were left by a version of
+        the service without leases.
+        """
+        result = TrainingStatusStorage.__collection().update_many(
+            dict(TrainingStatusStorage.__worker_owned_query(),
+                 **{'$or': [{'lease_expires_at': {'$lt': datetime.datetime.utcnow()}}, {'lease_expires_at': None}]}),
+            {'$set': {'status': AutoODMethodStatuses.PENDING.value,
+                      'description': "Worker of the training job stopped and the job is queued again",
+                      'lease_owner': None,
+                      'lease_expires_at': None}},
+        )
+        if result.modified_count:
+            TrainingStatusStorage.__status_cache.clear()
+        return result.modified_count
+
+    @staticmethod
+    def find_awaiting_release() -> List[TrainingStatus]:
+        """Jobs which uploaded a monitoring model and wait for its build"""
+        status_documents = TrainingStatusStorage.__collection().find(
+            {'status': AutoODMethodStatuses.DEPLOYING.value, 'deploy_started_at': {'$ne': None}})
+        return [TrainingStatusStorage.__from_document(status_document) for status_document in status_documents]
+
+    @staticmethod
+    def claim_release(model_status: TrainingStatus) -> bool:
+        """
+        Atomically takes over finishing the deployment of a job awaiting release, so that it
+        is finished once even if several release watchers see the same build finish.
+        Clears pending_metric_model_version_id of model_status on success.
+        """
+        status_document = TrainingStatusStorage.__collection().find_one_and_update(
+            {'model_version_id': model_status.model_version_id,
+             'status': AutoODMethodStatuses.DEPLOYING.value,
+             'pending_metric_model_version_id': model_status.pending_metric_model_version_id},
+            {'$set': {'pending_metric_model_version_id': None}},
+        )
+        TrainingStatusStorage.__status_cache.pop(model_status.model_version_id, None)
+        if status_document is None:
+            return False
+        model_status.pending_metric_model_version_id = None
+        return True
+
+    @staticmethod
+    def count_by_state(state: AutoODMethodStatuses) -> int:
+        return TrainingStatusStorage.__collection().count_documents({'status': state.value})
 
     @staticmethod
     def save_status(status: TrainingStatus):
-        TrainingStatusStorage.__collection().replace_one(
+        """Saves every field of the status besides its lease"""
+        TrainingStatusStorage.__status_cache.pop(status.model_version_id, None)
+        TrainingStatusStorage.__collection().update_one(
             {'model_version_id': status.model_version_id},
-            {
-                'model_version_id': status.model_version_id,
-                'training_data_path': status.training_data_path,
-                'status': status.state.value,
-                'description': status.description
-            },
+            {'$set': TrainingStatusStorage.__to_document(status)},
             upsert=True
         )
+
+    @staticmethod
+    def save_leased_status(status: TrainingStatus) -> bool:
+        """
+        Saves the status like save_status, but only while the job is still leased to status.lease_owner.
+        Used by training job processes, so that a job taken over by another worker is not overwritten.
+        :return: False if the lease was lost and nothing was saved
+        """
+        TrainingStatusStorage.__status_cache.pop(status.model_version_id, None)
+        result = TrainingStatusStorage.__collection().update_one(
+            {'model_version_id': status.model_version_id, 'lease_owner': status.lease_owner},
+            {'$set': TrainingStatusStorage.__to_document(status)},
+        )
+        return result.matched_count == 1
+
+    @staticmethod
+    def save_statuses(statuses: List[TrainingStatus]) -> None:
+        """Saves many statuses with a single bulk write"""
+        if not statuses:
+            return
+        for status in statuses:
+            TrainingStatusStorage.__status_cache.pop(status.model_version_id, None)
+        TrainingStatusStorage.__collection().bulk_write(
+            [UpdateOne({'model_version_id': status.model_version_id},
+                       {'$set': TrainingStatusStorage.__to_document(status)}, upsert=True)
+             for status in statuses],
+            ordered=False,
+        )
+
+    @staticmethod
+    def __to_document(status: TrainingStatus) -> dict:
+        return {
+            'model_version_id': status.model_version_id,
+            'training_data_path': status.training_data_path,
+            'status': status.state.value,
+            'description': status.description,
+            'priority': status.priority,
+            'created_at': status.created_at,
+            'model_name': status.model_name,
+            'model_params': status.model_params,
+            'metric_model_version_id': status.metric_model_version_id,
+            'stages': [asdict(stage) for stage in status.stages],
+            'pending_metric_model_version_id': status.pending_metric_model_version_id,
+            'metric_threshold': status.metric_threshold,
+            'deploy_started_at': status.deploy_started_at,
+        }
+
+    @staticmethod
+    def __models() -> gridfs.GridFS:
+        return gridfs.GridFS(TrainingStatusStorage.__db(), collection='models')
+
+    @staticmethod
+    def save_model(model_version_id: int, model) -> None:
+        """Stores the fitted outlier detector of a training job, replacing the previous one"""
+        import joblib
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        models = TrainingStatusStorage.__models()
+        previous_files = [f._id for f in models.find({'model_version_id': model_version_id})]
+        models.put(buffer.getvalue(), model_version_id=model_version_id)
+        for file_id in previous_files:
+            models.delete(file_id)
+
+    @staticmethod
+    def load_model(model_version_id: int):
+        import joblib
+        try:
+            model_file = TrainingStatusStorage.__models().get_last_version(model_version_id=model_version_id)
+        except gridfs.NoFile:
+            return None
+        return joblib.load(io.BytesIO(model_file.read()))
+
+
+os.register_at_fork(after_in_child=TrainingStatusStorage._reset_after_fork)
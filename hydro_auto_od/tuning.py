@@ -1,90 +1,461 @@
+import copy
+from contextlib import nullcontext
+import os
+import shutil
+import tempfile
+import time
 import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.metrics import auc
 from itertools import combinations
 from sklearn.utils import shuffle as sh
 from sklearn.model_selection import ParameterGrid
+from sklearn.neighbors import NearestNeighbors
+from sklearn.ensemble._iforest import _average_path_length
+from pyod.models.iforest import IForest
+from pyod.models.lof import LOF
+from pyod.models.ocsvm import OCSVM
 
+# Estimators whose fit cost grows faster than linearly with the number of rows
+ROW_CAPPED_ESTIMATORS = (OCSVM,)
 
-def compute_mv(clf, X_train, X_test, alphas, 
-               lim_inf, lim_sup, n_sim, features, vol_sup):
-    # Random Uniform sampling
-    U = np.random.uniform(lim_inf, lim_sup, 
-                size=[n_sim, len(features)])
-    # Training classifier
-    clf = clf.fit(X_train)
-    score_U = -clf.decision_function(U)
-    score_test = -clf.decision_function(X_test)
-    # compute offsets
-    offsets_p = np.percentile(score_test, 100 * (1 - alphas))
-    # compute volumes of associated level sets
-    vol_p = (np.array([np.mean(score_U >= offset) for offset in offsets_p]) *
-             vol_sup)
-    return vol_p
 
+class MassVolume:
+    """
+    Mass-Volume engine over a single feature subset.
 
-def low_tuning(X_train, X_test, object_list, base_estimator = None, 
-               alphas=np.arange(0.05, 1., 0.05), n_sim = 100000):
-    max_features = 5
-    _, n_features = X_train.shape
-    features_list = np.arange(n_features)
-    auc_test = np.zeros(len(object_list))
-    combs = list(combinations(features_list, max_features))
-    for i, comb in enumerate(combs):
-        X_train_ = X_train[:, comb]
-        X_ = X_test[:, comb]
-        lim_inf = X_.min(axis=0)
-        lim_sup = X_.max(axis=0)
-        for p, object_ in enumerate(object_list):
-            volume_support = (lim_sup - lim_inf).prod()
-            if volume_support > 0:
-                if base_estimator is None:
-                    clf = object_()
-                else:
-                    clf = base_estimator(**object_)
-                vol_p = compute_mv(clf, X_train_, X_, alphas, lim_inf, 
-                           lim_sup, n_sim, comb, volume_support)
-                auc_test[p] = auc(alphas, vol_p)
-    auc_test /= len(combs)
+    Bounding box, its volume and the uniform Monte-Carlo sample are computed
+    once and shared by every estimator scored against this subset.
+    """
+    def __init__(self, X_test, n_sim, random_state=None):
+        # Bounds and volume in float64, narrow integer columns would overflow
+        self.lim_inf = X_test.min(axis=0).astype(np.float64)
+        self.lim_sup = X_test.max(axis=0).astype(np.float64)
+        self.volume_support = (self.lim_sup - self.lim_inf).prod()
+        self.n_sim = n_sim
+        self.random_state = random_state
+        self._U = None
+
+    @property
+    def U(self):
+        # Random Uniform sampling, drawn lazily so that degenerate subsets cost nothing
+        if self._U is None:
+            rng = np.random.RandomState(self.random_state)
+            self._U = rng.uniform(self.lim_inf, self.lim_sup,
+                                  size=[self.n_sim, len(self.lim_inf)])
+        return self._U
+
+    def sample_into(self, out):
+        """Draws the uniform sample into a preallocated array, e.g. a float32 or memory-mapped one"""
+        rng = np.random.RandomState(self.random_state)
+        out[:] = rng.uniform(self.lim_inf, self.lim_sup, size=out.shape)
+        self._U = out
+
+    def head(self, n_sim):
+        """Engine over the same subset that uses the first n_sim points of this engine's sample"""
+        mv = copy.copy(self)
+        mv.n_sim = n_sim
+        if self.volume_support > 0:
+            mv._U = self.U[:n_sim]
+        return mv
+
+    def level_set_volumes(self, score_U, offsets):
+        # Volume of {x: score(x) >= offset} for every offset in a single searchsorted pass
+        sorted_score_U = np.sort(score_U)
+        n_above = len(sorted_score_U) - np.searchsorted(sorted_score_U, offsets, side='left')
+        return n_above / len(sorted_score_U) * self.volume_support
+
+    def compute_mv(self, clf, X_train, X_test, alphas, max_fit_rows=None):
+        # Training classifier
+        clf = clf.fit(fit_rows(clf, X_train, max_fit_rows, self.random_state))
+        score_U = -clf.decision_function(self.U)
+        score_test = -clf.decision_function(X_test)
+        # compute offsets
+        offsets_p = np.percentile(score_test, 100 * (1 - alphas))
+        # compute volumes of associated level sets
+        return self.level_set_volumes(score_U, offsets_p)
+
+
+def compute_mv(clf, X_train, X_test, alphas, n_sim, random_state=None):
+    return MassVolume(X_test, n_sim, random_state).compute_mv(clf, X_train, X_test, alphas)
+
+
+def _spawn_seeds(random_state, n_seeds):
+    # Independent per-task seeds, reproducible whenever random_state is fixed
+    return [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(random_state).spawn(n_seeds)]
+
+
+def all_feature_subsets(n_features, max_features=5):
+    return [np.array(comb) for comb in combinations(range(n_features), max_features)]
+
+
+def draw_feature_subsets(X_test, n_subsets, max_features=5, random_state=None, max_attempts=100):
+    """
+    Random feature subsets whose bounding box on X_test has a positive volume.
+    Gives up after max_attempts draws per subset, so it may return fewer of them.
+    """
+    n_features = X_test.shape[1]
+    rng = np.random.RandomState(random_state)
+    subsets = []
+    for _ in range(n_subsets * max_attempts):
+        if len(subsets) == n_subsets:
+            break
+        features = sh(np.arange(n_features), random_state=rng)[:max_features]
+        X_ = X_test[:, features]
+        if (X_.max(axis=0).astype(np.float64) - X_.min(axis=0)).prod() > 0:
+            subsets.append(features)
+    return subsets
+
+
+class SubsetSamples:
+    """
+    Feature subsets of a model selection job with a MassVolume engine for each of them.
+
+    Bounding boxes, volumes and uniform samples are computed once and shared by model family
+    selection and hyperparameter tuning, so that all candidates are compared on identical subsets
+    and samples. Stages needing fewer subsets or samples take prefixes of them with head().
+    Samples are float32 and are memory-mapped from a temporary file once they exceed memmap_bytes,
+    call close() or use the instance as a context manager to remove it.
+    """
+    memmap_bytes = 64 * 2 ** 20
+
+    def __init__(self, X_test, subsets, n_sim, random_state=None, memmap_bytes=None):
+        self.subsets = [np.asarray(features) for features in subsets]
+        self.seeds = _spawn_seeds(random_state, len(self.subsets))
+        self.n_sim = n_sim
+        self.engines = [MassVolume(X_test[:, features], n_sim, random_state=seed)
+                        for features, seed in zip(self.subsets, self.seeds)]
+        self._tmp_dir = None
+
+        memmap_bytes = memmap_bytes if memmap_bytes is not None else self.memmap_bytes
+        width = max((len(features) for features in self.subsets), default=0)
+        shape = (len(self.subsets), n_sim, width)
+        if np.prod(shape) * np.dtype(np.float32).itemsize > memmap_bytes:
+            self._tmp_dir = tempfile.mkdtemp(prefix="auto_od_samples_")
+            storage = np.memmap(os.path.join(self._tmp_dir, "U.dat"), dtype=np.float32, mode="w+", shape=shape)
+        else:
+            storage = np.empty(shape, dtype=np.float32)
+        for i, (features, mv) in enumerate(zip(self.subsets, self.engines)):
+            if mv.volume_support > 0:
+                mv.sample_into(storage[i, :, :len(features)])
+
+    def head(self, n_subsets=None, n_sim=None):
+        """
+        :return: (features, engine, seed) of the first n_subsets subsets, engines using
+            the first n_sim points of their samples
+        """
+        n_sim = n_sim if n_sim is not None else self.n_sim
+        if n_sim > self.n_sim:
+            raise ValueError(f"Only {self.n_sim} uniform samples are precomputed, requested {n_sim}")
+        return [(features, mv.head(n_sim), seed)
+                for features, mv, seed in list(zip(self.subsets, self.engines, self.seeds))[:n_subsets]]
+
+    def close(self):
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            self._tmp_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _make_estimator(object_, base_estimator, random_state):
+    if base_estimator is None:
+        clf = object_()
+    else:
+        clf = base_estimator(**object_)
+    if 'random_state' in clf.get_params():
+        clf.set_params(random_state=random_state)
+    return clf
+
+
+def fit_rows(clf, X_train, max_fit_rows=None, random_state=None):
+    """
+    Rows of X_train to fit clf on: a uniform sample of max_fit_rows rows if clf is
+    one of ROW_CAPPED_ESTIMATORS and X_train has more rows, all of X_train otherwise
+    """
+    n_rows = X_train.shape[0]
+    if max_fit_rows is None or n_rows <= max_fit_rows or not isinstance(clf, ROW_CAPPED_ESTIMATORS):
+        return X_train
+    rng = np.random.RandomState(random_state)
+    return X_train[np.sort(rng.choice(n_rows, max_fit_rows, replace=False))]
+
+
+def _kneighbors(X_train, n_neighbors, queries, approximate=False, random_state=None):
+    """
+    Builds one neighbor index over X_train and queries it once at the largest k.
+    :return: (distances, indices) of training rows to their neighbors, excluding themselves,
+        followed by (distances, indices) for every array in queries
+    """
+    if approximate:
+        try:
+            from pynndescent import NNDescent
+        except ImportError:
+            approximate = False
+    if approximate:
+        index = NNDescent(X_train, n_neighbors=n_neighbors + 1, random_state=random_state)
+        indices, distances = index.neighbor_graph
+        results = [(distances[:, 1:], indices[:, 1:])]
+        for X in queries:
+            indices, distances = index.query(X, k=n_neighbors)
+            results.append((distances, indices))
+        return results
+    index = NearestNeighbors(n_neighbors=n_neighbors).fit(X_train)
+    return [index.kneighbors()] + [index.kneighbors(X) for X in queries]
+
+
+def _local_reachability_density(distances, indices, k_distance):
+    return 1. / (np.mean(np.maximum(distances, k_distance[indices]), axis=1) + 1e-10)
+
+
+def _lof_level_set_volumes(mv, X_train, X_test, object_list, alphas, approx_rows, seed):
+    """
+    MV curves of LOF for every n_neighbors in object_list from a single kNN computation.
+    Neighbors for smaller k are the leading columns of the neighbors found at the largest k.
+    """
+    n_train = X_train.shape[0]
+    ks = [min(params['n_neighbors'], n_train - 1) for params in object_list]
+    approximate = approx_rows is not None and n_train > approx_rows
+    (dist_train, ind_train), (dist_test, ind_test), (dist_U, ind_U) = _kneighbors(
+        X_train, max(ks), [X_test, mv.U], approximate=approximate, random_state=seed)
+
+    volumes = []
+    for k in ks:
+        k_distance = dist_train[:, k - 1]
+        lrd_train = _local_reachability_density(dist_train[:, :k], ind_train[:, :k], k_distance)
+        # Negated pyod LOF decision_function, i.e. minus the mean ratio of neighbors' lrd to own lrd
+        scores = []
+        for distances, indices in ((dist_test, ind_test), (dist_U, ind_U)):
+            lrd = _local_reachability_density(distances[:, :k], indices[:, :k], k_distance)
+            scores.append(-np.mean(lrd_train[indices[:, :k]] / lrd[:, np.newaxis], axis=1))
+        score_test, score_U = scores
+        offsets_p = np.percentile(score_test, 100 * (1 - alphas))
+        volumes.append(mv.level_set_volumes(score_U, offsets_p))
+    return volumes
+
+
+def _iforest_depths(forest, X, n_estimators):
+    """Summed path lengths of X over the first n trees of a fitted forest, for every n in n_estimators"""
+    depths = np.zeros(X.shape[0])
+    prefix_depths = {}
+    for n_trees, (tree, features) in enumerate(zip(forest.estimators_, forest.estimators_features_), start=1):
+        X_subset = X[:, features]
+        leaves_index = tree.apply(X_subset)
+        node_indicator = tree.decision_path(X_subset)
+        depths += (np.ravel(node_indicator.sum(axis=1))
+                   + _average_path_length(tree.tree_.n_node_samples[leaves_index]) - 1.0)
+        if n_trees in n_estimators:
+            prefix_depths[n_trees] = depths.copy()
+    return prefix_depths
+
+
+def _iforest_level_set_volumes(mv, X_train, X_test, object_list, alphas, approx_rows, seed):
+    """
+    MV curves of IForest for every n_estimators in object_list from a single forest of the
+    largest size, since a forest's first n trees are a forest of n trees themselves.
+    """
+    n_estimators = [params['n_estimators'] for params in object_list]
+    forest = IForest(n_estimators=max(n_estimators), random_state=seed).fit(X_train).detector_
+    depths_test = _iforest_depths(forest, X_test, set(n_estimators))
+    depths_U = _iforest_depths(forest, mv.U, set(n_estimators))
+
+    volumes = []
+    for n in n_estimators:
+        # IsolationForest.score_samples of a forest made of the first n trees
+        denominator = n * _average_path_length([forest.max_samples_])[0]
+        score_test = -2 ** (-depths_test[n] / denominator)
+        score_U = -2 ** (-depths_U[n] / denominator)
+        offsets_p = np.percentile(score_test, 100 * (1 - alphas))
+        volumes.append(mv.level_set_volumes(score_U, offsets_p))
+    return volumes
+
+
+def _shared_level_set_volumes(object_list, base_estimator):
+    """Picks an evaluator computing MV curves of a whole parameter grid from one shared fit, if there is one"""
+    if base_estimator is LOF and all(set(params) == {'n_neighbors'} for params in object_list):
+        return _lof_level_set_volumes
+    if base_estimator is IForest and all(set(params) == {'n_estimators'} for params in object_list):
+        return _iforest_level_set_volumes
+    return None
+
+
+def _evaluate_subset(X_train_, X_, mv, object_list, base_estimator, alphas, seed, approx_rows=None,
+                     max_fit_rows=None):
+    """
+    Fits every candidate on one feature subset.
+    :param mv: MassVolume engine of the subset
+    :param max_fit_rows: number of rows ROW_CAPPED_ESTIMATORS are fitted on at most
+    :return: MV AUCs of the candidates and the number of fits it took
+    """
+    auc_subset = np.zeros(len(object_list))
+    n_fits = 0
+    if mv.volume_support > 0:
+        shared_level_set_volumes = _shared_level_set_volumes(object_list, base_estimator)
+        if shared_level_set_volumes is not None:
+            volumes = shared_level_set_volumes(mv, X_train_, X_, object_list, alphas, approx_rows, seed)
+            n_fits = 1
+        else:
+            volumes = (mv.compute_mv(_make_estimator(object_, base_estimator, random_state=seed),
+                                     X_train_, X_, alphas, max_fit_rows)
+                       for object_ in object_list)
+            n_fits = len(object_list)
+        for p, vol_p in enumerate(volumes):
+            auc_subset[p] = auc(alphas, vol_p)
+    return auc_subset, n_fits
+
+
+class TuningBudget:
+    """Compute budget of a model selection job, in fits and/or seconds. Also counts the fits spent"""
+    def __init__(self, max_fits=None, max_seconds=None):
+        self.max_fits = max_fits
+        self.max_seconds = max_seconds
+        self.n_fits = 0
+        self.started_at = time.monotonic()
+
+    def allows(self, n_fits):
+        if self.max_fits is not None and self.n_fits + n_fits > self.max_fits:
+            return False
+        if self.max_seconds is not None and time.monotonic() - self.started_at > self.max_seconds:
+            return False
+        return True
+
+    def spend(self, n_fits):
+        self.n_fits += n_fits
+
+
+def halving_search(X_train, X_test, subsets, object_list, base_estimator, alphas,
+                   eta=3, min_rows=500, budget=None, n_jobs=1, random_state=None, approx_rows=None,
+                   max_fit_rows=None):
+    """
+    Successive halving over candidates. Early rounds score every candidate on few feature
+    subsets and a row subsample of X_train, and only the best 1/eta of them go on to the next
+    round. The last round uses every subset and all rows. Rounds after the first one are
+    skipped once the budget is exhausted, returning the best candidate of the last round run.
+    :param subsets: (features, engine, seed) of every subset, see SubsetSamples.head
+    """
+    budget = budget if budget is not None else TuningBudget()
+    if not subsets:
+        return object_list[0]
+    n_train = X_train.shape[0]
+    n_rounds = 1 + int(np.ceil(np.log(len(object_list)) / np.log(eta))) if len(object_list) > 1 else 1
+    rng = np.random.RandomState(_spawn_seeds(random_state, 1)[0])
+    subsets = [subsets[i] for i in rng.permutation(len(subsets))]
+
+    candidates = np.arange(len(object_list))
+    auc_round = np.zeros(len(candidates))
+    for r in range(n_rounds):
+        scale = float(eta) ** (r - n_rounds + 1)
+        n_rows = min(n_train, max(min_rows, int(n_train * scale)))
+        n_subsets = max(1, int(np.ceil(len(subsets) * scale)))
+        if r > 0 and not budget.allows(len(candidates) * n_subsets):
+            break
+        X_rows = X_train[np.sort(rng.choice(n_train, n_rows, replace=False))]
+        round_candidates = [object_list[p] for p in candidates]
+        aucs, n_fits = zip(*Parallel(n_jobs=n_jobs)(
+            delayed(_evaluate_subset)(X_rows[:, features], X_test[:, features], mv, round_candidates,
+                                      base_estimator, alphas, seed, approx_rows, max_fit_rows)
+            for features, mv, seed in subsets[:n_subsets]))
+        budget.spend(sum(n_fits))
+        auc_round = np.mean(aucs, axis=0)
+        kept = np.argsort(auc_round, kind='stable')[:int(np.ceil(len(candidates) / eta))]
+        candidates, auc_round = candidates[kept], auc_round[kept]
+        if len(candidates) == 1:
+            break
+    return object_list[candidates[np.argmin(auc_round)]]
+
+
+def _own_samples(samples, build):
+    # Samples given by the caller are left open, samples built here are removed on exit
+    return nullcontext(samples) if samples is not None else build()
+
+
+def _search_subsets(X_train, X_test, subsets, object_list, base_estimator, alphas, n_jobs, budget, approx_rows,
+                    max_fit_rows):
+    """
+    Scores every candidate on every subset and returns the one with the lowest mean MV AUC.
+    With a limited budget subsets are scored in batches of n_jobs, and once the budget is
+    exhausted the rest of them are skipped, comparing candidates on the subsets scored so far.
+    """
+    if not subsets:
+        return object_list[0]
+    limited = budget is not None and (budget.max_fits is not None or budget.max_seconds is not None)
+    batch_size = effective_n_jobs(n_jobs) if limited else len(subsets)
+    aucs = []
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for start in range(0, len(subsets), batch_size):
+            batch = subsets[start:start + batch_size]
+            # The first batch always runs, so that candidates are compared on at least one subset
+            if aucs and not budget.allows(fits_per_subset * len(batch)):
+                break
+            # Subsets are independent, results come back in submission order
+            results = parallel(
+                delayed(_evaluate_subset)(X_train[:, features], X_test[:, features], mv, object_list,
+                                          base_estimator, alphas, seed, approx_rows, max_fit_rows)
+                for features, mv, seed in batch)
+            aucs.extend(auc_subset for auc_subset, _ in results)
+            n_fits = sum(n_fits for _, n_fits in results)
+            if budget is not None:
+                budget.spend(n_fits)
+            fits_per_subset = n_fits / len(batch)
+    auc_test = np.mean(aucs, axis=0)
     best_p = np.argmin(auc_test)
     best_ = object_list[best_p]
     return best_
+
+
+def low_tuning(X_train, X_test, object_list, base_estimator = None, 
+               alphas=np.arange(0.05, 1., 0.05), n_sim = 100000, n_jobs=1, random_state=None,
+               search='exhaustive', budget=None, approx_rows=None, samples=None, max_fit_rows=None):
+    """
+    Compares candidates on every 5 feature subset.
+    :param samples: SubsetSamples over those subsets to take the first n_sim uniform points from,
+        drawn here if not given
+    """
+    object_list = list(object_list)
+    with _own_samples(samples, lambda: SubsetSamples(X_test, all_feature_subsets(X_test.shape[1]),
+                                                     n_sim, random_state)) as samples:
+        subsets = samples.head(n_sim=n_sim)
+        if search == 'halving':
+            return halving_search(X_train, X_test, subsets, object_list, base_estimator, alphas,
+                                  budget=budget, n_jobs=n_jobs, random_state=random_state, approx_rows=approx_rows,
+                                  max_fit_rows=max_fit_rows)
+        return _search_subsets(X_train, X_test, subsets, object_list, base_estimator, alphas,
+                               n_jobs, budget, approx_rows, max_fit_rows)
     
 
 def high_tuning(X_train, X_test, object_list, base_estimator = None, 
-               alphas=np.arange(0.05, 1., 0.05), averaging = 50, n_sim = 100000):
-    max_features = 5
-    _, n_features = X_train.shape
-    auc_est = np.zeros(len(object_list))
-    for p, object_ in enumerate(object_list):
-        nb_exp = 0
-        while nb_exp < averaging:  
-            features = sh(np.arange(n_features))[:max_features]
-            X_train_ = X_train[:, features]
-            X_ = X_test[:, features]
-            lim_inf = X_.min(axis=0)
-            lim_sup = X_.max(axis=0)
-            volume_support = (lim_sup - lim_inf).prod()
-            if volume_support > 0:
-                nb_exp += 1
-                if base_estimator is None:
-                    clf = object_()
-                else:
-                    clf = base_estimator(**object_)
-                vol_p = compute_mv(clf, X_train_, X_, alphas, lim_inf, 
-                                   lim_sup, n_sim, features, volume_support)
-                auc_est[p] += auc(alphas, vol_p)
-    auc_est /= averaging 
-    best_p = np.argmin(auc_est)
-    best_ = object_list[best_p]
-    return best_
+               alphas=np.arange(0.05, 1., 0.05), averaging = 50, n_sim = 100000, n_jobs=1, random_state=None,
+               budget=None, approx_rows=None, samples=None, max_fit_rows=None):
+    """
+    Compares candidates on the same `averaging` random non-degenerate 5 feature subsets.
+    :param samples: SubsetSamples over random subsets to take the first `averaging` subsets
+        and n_sim uniform points from, drawn here if not given
+    """
+    object_list = list(object_list)
+    with _own_samples(samples, lambda: SubsetSamples(X_test, draw_feature_subsets(X_test, averaging,
+                                                                                  random_state=random_state),
+                                                     n_sim, random_state)) as samples:
+        subsets = samples.head(n_subsets=averaging, n_sim=n_sim)
+        return _search_subsets(X_train, X_test, subsets, object_list, base_estimator, alphas,
+                               n_jobs, budget, approx_rows, max_fit_rows)
 
 
-def model_tuning(X_train, X_test, base_estimator=None, parameters=None, alphas=np.arange(0.05, 1., 0.05)):
+def model_tuning(X_train, X_test, base_estimator=None, parameters=None, alphas=np.arange(0.05, 1., 0.05),
+                 n_jobs=1, random_state=None, search='exhaustive', budget=None, approx_rows=None, samples=None):
+    """
+    :param samples: SubsetSamples of model family selection, tuning uses prefixes of its subsets and samples
+    """
     param_grid = ParameterGrid(parameters)
     _, n_features = X_train.shape
     if n_features <= 7:
-        res = low_tuning(X_train, X_test, base_estimator=base_estimator, object_list = param_grid, alphas=alphas, n_sim = 10000) 
+        res = low_tuning(X_train, X_test, base_estimator=base_estimator, object_list = param_grid, alphas=alphas, n_sim = 10000,
+                         n_jobs=n_jobs, random_state=random_state, search=search, budget=budget,
+                         approx_rows=approx_rows, samples=samples) 
     else:
-        res = high_tuning(X_train, X_test, base_estimator=base_estimator, object_list = param_grid, averaging = 10, alphas=alphas, n_sim = 10000) 
+        res = high_tuning(X_train, X_test, base_estimator=base_estimator, object_list = param_grid, averaging = 10, alphas=alphas, n_sim = 10000,
+                          n_jobs=n_jobs, random_state=random_state, budget=budget, approx_rows=approx_rows,
+                          samples=samples) 
     return res
-
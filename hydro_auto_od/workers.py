@@ -0,0 +1,32 @@
+from typing import List
+
+from hydro_auto_od.cluster import get_cluster
+from hydro_auto_od.config import config
+from hydro_auto_od.release_watcher import ReleaseWatcher
+from hydro_auto_od.scheduler import TrainingJobScheduler
+
+
+# hydro_auto_od.main imports hydrosdk and the ML stack, so the functions below import it on
+# first use. Training job processes import it themselves, unless the service preloaded it.
+
+def run_training_jobs(monitored_model_version_ids: List[int], training_data_path: str, lease_owner: str) -> None:
+    from hydro_auto_od.main import train_and_deploy_monitoring_models
+    train_and_deploy_monitoring_models(monitored_model_version_ids, training_data_path, lease_owner)
+
+
+def assign_monitoring_metric(model_status, metric_model_version) -> None:
+    from hydro_auto_od.main import assign_monitoring_metric
+    assign_monitoring_metric(model_status, metric_model_version)
+
+
+job_scheduler = TrainingJobScheduler(run_training_jobs,
+                                     max_workers=config.max_training_jobs,
+                                     job_timeout=config.training_job_timeout,
+                                     poll_interval=config.scheduler_poll_interval,
+                                     max_jobs_per_worker=config.max_jobs_per_worker,
+                                     lease_duration=config.lease_duration,
+                                     heartbeat_interval=config.lease_heartbeat_interval)
+
+release_watcher = ReleaseWatcher(get_cluster, assign_monitoring_metric,
+                                 poll_interval=config.release_poll_interval,
+                                 timeout=config.release_timeout)
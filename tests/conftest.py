@@ -0,0 +1,5 @@
+import os
+
+# Settings required by hydro_auto_od.config, tests do not connect to MongoDB
+os.environ.setdefault("MONGO_USER", "test")
+os.environ.setdefault("MONGO_PASS", "test")
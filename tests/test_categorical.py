@@ -0,0 +1,70 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from pyod.models.iforest import IForest
+
+from hydro_auto_od.categorical import encode_categorical
+from hydro_auto_od.monitoring_model import write_monitoring_model
+
+
+def test_codes_follow_sorted_categories():
+    data = pd.DataFrame({"color": ["red", "blue", "green", "blue"], "size": [1., 2., 3., 4.]})
+
+    encoded, categories = encode_categorical(data, ["color"])
+
+    assert categories == {"color": ["blue", "green", "red"]}
+    assert encoded["color"].tolist() == [2, 0, 1, 0]
+    assert encoded["color"].dtype == np.uint8
+    assert encoded["size"].tolist() == data["size"].tolist()
+    # The input frame, which may be shared by other jobs, is left as is
+    assert data["color"].tolist() == ["red", "blue", "green", "blue"]
+
+
+def test_missing_values_get_the_reserved_code():
+    data = pd.DataFrame({"color": pd.Categorical(["red", None, "blue"], categories=["red", "blue", "unused"])})
+
+    encoded, categories = encode_categorical(data, ["color"])
+
+    assert categories == {"color": ["blue", "red"]}
+    assert encoded["color"].tolist() == [1, 2, 0]
+
+
+def test_many_categories_get_a_wider_dtype():
+    data = pd.DataFrame({"id": [f"id{i:04d}" for i in range(300)]})
+    encoded, _ = encode_categorical(data, ["id"])
+    assert encoded["id"].dtype == np.uint16
+    assert encoded["id"].tolist() == list(range(300))
+
+
+@pytest.fixture
+def monitoring_model(tmp_path, monkeypatch):
+    """Monitoring model with a categorical field written as a training job does, and its loaded func_main"""
+    rng = np.random.RandomState(0)
+    data = pd.DataFrame({"color": rng.choice(["red", "green", "blue"], size=300), "size": rng.randn(300)})
+    encoded, categories = encode_categorical(data, ["color"])
+    outlier_detector = IForest(n_estimators=20, random_state=0).fit(encoded[["color", "size"]].to_numpy())
+    folder_path = str(tmp_path / "model")
+    write_monitoring_model(folder_path, outlier_detector, ["color", "size"], categorical_codes=categories)
+
+    monkeypatch.setenv("MODEL_FILES_PATH", folder_path)
+    spec = importlib.util.spec_from_file_location("func_main", os.path.join(folder_path, "src", "func_main.py"))
+    func_main = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(func_main)
+    return outlier_detector, func_main
+
+
+def test_monitoring_model_encodes_categories_like_training(monitoring_model):
+    outlier_detector, func_main = monitoring_model
+    expected = outlier_detector.predict_proba(np.array([[2., 0.5], [0., -1.], [3., 0.5]]), method='unify')[:, 1]
+
+    assert isinstance(func_main.predict(color="red", size=0.5)["value"], float)
+    # Known categories get their training codes, unseen ones the reserved code
+    assert func_main.predict(color="red", size=0.5)["value"] == pytest.approx(expected[0])
+    assert func_main.predict(color=b"blue", size=-1.)["value"] == pytest.approx(expected[1])
+    assert func_main.predict(color="purple", size=0.5)["value"] == pytest.approx(expected[2])
+
+    batch = func_main.predict_batch(color=np.array(["red", "blue", "purple"]), size=np.array([0.5, -1., 0.5]))
+    np.testing.assert_allclose(batch["value"], expected)
@@ -0,0 +1,20 @@
+from hydro_auto_od.config import Config
+
+
+def test_ocsvm_max_rows_defaults_to_a_cap(monkeypatch):
+    monkeypatch.delenv("OCSVM_MAX_ROWS", raising=False)
+    assert Config().ocsvm_max_rows == 50000
+
+
+def test_zero_turns_ocsvm_max_rows_off(monkeypatch):
+    monkeypatch.setenv("OCSVM_MAX_ROWS", "0")
+    assert Config().ocsvm_max_rows is None
+    monkeypatch.setenv("OCSVM_MAX_ROWS", "1000")
+    assert Config().ocsvm_max_rows == 1000
+
+
+def test_zero_turns_training_data_max_rows_off(monkeypatch):
+    monkeypatch.delenv("TRAINING_DATA_MAX_ROWS", raising=False)
+    assert Config().training_data_max_rows == 500000
+    monkeypatch.setenv("TRAINING_DATA_MAX_ROWS", "0")
+    assert Config().training_data_max_rows is None
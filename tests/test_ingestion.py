@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from hydro_serving_grpc.serving.contract.field_pb2 import ModelField
+from hydro_serving_grpc.serving.contract.tensor_pb2 import TensorShape
+from hydro_serving_grpc.serving.contract.types_pb2 import DT_DOUBLE, DT_INT8, DT_STRING, DT_UINT8
+
+from hydro_auto_od.ingestion import ARROW, CSV, PARQUET, _downcast, detect_format, read_training_data
+
+
+def scalar_field(name, dtype):
+    return ModelField(name=name, dtype=dtype, shape=TensorShape())
+
+
+def write_csv(data, path):
+    # Training data files have no header, columns follow the sorted field names
+    data.to_csv(path, header=False, index=False)
+    return str(path)
+
+
+def test_downcast_narrows_integers_in_range():
+    chunk = pd.DataFrame({"a": [-128, 0, 127], "b": [0, 1, 255]})
+    chunk = _downcast(chunk, {"a": np.dtype("int8"), "b": np.dtype("uint8")})
+    assert chunk["a"].dtype == np.int8
+    assert chunk["b"].dtype == np.uint8
+
+
+def test_downcast_keeps_integers_out_of_range():
+    chunk = pd.DataFrame({"a": [-129, 0, 127], "b": [-1, 1, 255], "c": [0, 70000, 1]})
+    chunk = _downcast(chunk, {"a": np.dtype("int8"), "b": np.dtype("uint8"), "c": np.dtype("int16")})
+    assert chunk["a"].tolist() == [-129, 0, 127]
+    assert chunk["b"].tolist() == [-1, 1, 255]
+    assert chunk["c"].tolist() == [0, 70000, 1]
+
+
+def test_int_columns_round_trip_across_chunks(tmp_path):
+    # The second chunk does not fit int8 and must not wrap around
+    data = pd.DataFrame({"a": [1, -5, 300, -1000, 7], "b": [0.5, 1.5, 2.5, 3.5, 4.5]})
+    path = write_csv(data, tmp_path / "data.csv")
+    fields = [scalar_field("b", DT_DOUBLE), scalar_field("a", DT_INT8)]
+
+    training_data = read_training_data(path, fields, chunk_size=2)
+
+    assert list(training_data.columns) == ["a", "b"]
+    assert training_data["a"].tolist() == data["a"].tolist()
+    assert training_data["b"].tolist() == data["b"].tolist()
+
+
+def test_int_columns_in_range_are_narrowed(tmp_path):
+    data = pd.DataFrame({"a": [1, 2, 255, 0]})
+    path = write_csv(data, tmp_path / "data.csv")
+
+    training_data = read_training_data(path, [scalar_field("a", DT_UINT8)])
+
+    assert training_data["a"].dtype == np.uint8
+    assert training_data["a"].tolist() == data["a"].tolist()
+
+
+def test_max_rows_keeps_a_sample_of_rows(tmp_path):
+    data = pd.DataFrame({"a": np.arange(100), "b": np.arange(100) * 2.})
+    path = write_csv(data, tmp_path / "data.csv")
+    fields = [scalar_field("a", DT_INT8), scalar_field("b", DT_DOUBLE)]
+
+    training_data = read_training_data(path, fields, max_rows=10, chunk_size=7, random_state=0)
+
+    assert len(training_data) == 10
+    assert training_data["a"].is_unique
+    assert (training_data["b"] == training_data["a"].astype(np.int64) * 2).all()
+
+
+def columnar_data():
+    return pd.DataFrame({"a": [3, 1, 2, 3], "b": [0.5, 1.5, 2.5, 3.5], "c": ["x", "y", "x", "z"],
+                         "unused": ["not", "read", "at", "all"]})
+
+
+def columnar_fields():
+    return [scalar_field("c", DT_STRING), scalar_field("a", DT_INT8), scalar_field("b", DT_DOUBLE)]
+
+
+def assert_columnar_data_read(training_data, data):
+    assert list(training_data.columns) == ["a", "b", "c"]
+    assert training_data["a"].dtype == np.int8
+    assert training_data["a"].tolist() == data["a"].tolist()
+    assert training_data["b"].tolist() == data["b"].tolist()
+    assert isinstance(training_data["c"].dtype, pd.CategoricalDtype)
+    assert training_data["c"].astype(str).tolist() == data["c"].tolist()
+
+
+def test_read_parquet(tmp_path):
+    data = columnar_data()
+    path = tmp_path / "data.parquet"
+    data.to_parquet(path)
+    assert detect_format(str(path)) == PARQUET
+    assert_columnar_data_read(read_training_data(str(path), columnar_fields()), data)
+
+
+def test_read_feather(tmp_path):
+    data = columnar_data()
+    path = tmp_path / "data.feather"
+    data.to_feather(path)
+    assert detect_format(str(path)) == ARROW
+    assert_columnar_data_read(read_training_data(str(path), columnar_fields()), data)
+
+
+def test_format_is_detected_by_magic_bytes(tmp_path):
+    data = columnar_data()
+    data.to_parquet(tmp_path / "parquet")
+    data.to_feather(tmp_path / "feather")
+    write_csv(data, tmp_path / "csv")
+    assert detect_format(str(tmp_path / "parquet")) == PARQUET
+    assert detect_format(str(tmp_path / "feather")) == ARROW
+    assert detect_format(str(tmp_path / "csv")) == CSV
+    assert_columnar_data_read(read_training_data(str(tmp_path / "parquet"), columnar_fields()), data)
+
+
+def test_max_rows_of_columnar_data(tmp_path):
+    data = pd.DataFrame({"a": np.arange(100), "b": np.arange(100) * 2.})
+    path = tmp_path / "data.parquet"
+    data.to_parquet(path)
+    fields = [scalar_field("a", DT_INT8), scalar_field("b", DT_DOUBLE)]
+
+    training_data = read_training_data(str(path), fields, max_rows=10, random_state=0)
+
+    assert len(training_data) == 10
+    assert training_data["a"].is_unique
+    assert (training_data["b"] == training_data["a"].astype(np.int64) * 2).all()
@@ -0,0 +1,196 @@
+import pytest
+
+from hydro_auto_od import main, scheduler
+from hydro_auto_od.scheduler import TrainingJobScheduler
+from hydro_auto_od.training_status_storage import AutoODMethodStatuses, TRAINING_STATES, TrainingStatus
+
+
+class FakeStorage:
+    """In-memory stand-in for the lease methods of TrainingStatusStorage"""
+    def __init__(self):
+        self.statuses = {}
+
+    def add(self, model_version_id, training_data_path, state=AutoODMethodStatuses.PENDING, lease_owner=None):
+        self.statuses[model_version_id] = TrainingStatus(model_version_id=model_version_id,
+                                                         training_data_path=training_data_path,
+                                                         state=state, description="", lease_owner=lease_owner)
+
+    def claim_next_pending(self, lease_owner, lease_duration, training_data_path=None):
+        for status in self.statuses.values():
+            if status.state == AutoODMethodStatuses.PENDING and \
+                    training_data_path in (None, status.training_data_path):
+                status.state, status.lease_owner = AutoODMethodStatuses.STARTED, lease_owner
+                return status
+        return None
+
+    def renew_leases(self, model_version_ids, lease_owner, lease_duration):
+        return [i for i in model_version_ids if self.statuses[i].lease_owner == lease_owner]
+
+    def release_leases(self, model_version_ids, lease_owner):
+        for i in model_version_ids:
+            if self.statuses[i].lease_owner == lease_owner:
+                self.statuses[i].lease_owner = None
+
+    def requeue_leases(self, model_version_ids, lease_owner):
+        for i in model_version_ids:
+            status = self.statuses[i]
+            if status.lease_owner == lease_owner and status.state in TRAINING_STATES:
+                status.state, status.lease_owner = AutoODMethodStatuses.PENDING, None
+
+    def requeue_expired_leases(self):
+        return 0
+
+    def find_by_model_version_id(self, model_version_id):
+        return self.statuses.get(model_version_id)
+
+    def save_status(self, status):
+        self.statuses[status.model_version_id] = status
+
+
+class FakeProcess:
+    def __init__(self, target, args):
+        self.target = target
+        self.args = args
+        self.alive = False
+        self.exitcode = None
+        self.terminated = False
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.terminated = True
+        self.alive = False
+        self.exitcode = -15
+
+    def join(self):
+        pass
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = FakeStorage()
+    monkeypatch.setattr(scheduler, "TrainingStatusStorage", storage)
+    monkeypatch.setattr(scheduler, "Process", FakeProcess)
+    return storage
+
+
+def new_scheduler(max_workers=2, max_jobs_per_worker=1):
+    return TrainingJobScheduler(lambda *args: None, max_workers=max_workers, job_timeout=60., poll_interval=1.,
+                                max_jobs_per_worker=max_jobs_per_worker, heartbeat_interval=0., worker_id="worker-1")
+
+
+def running_processes(job_scheduler):
+    return {model_version_ids: process for model_version_ids, (process, _) in job_scheduler._running.items()}
+
+
+def test_launch_claims_up_to_max_workers(storage):
+    for i in range(3):
+        storage.add(i, f"data{i}.csv")
+    job_scheduler = new_scheduler(max_workers=2)
+
+    job_scheduler._launch()
+
+    processes = running_processes(job_scheduler)
+    assert list(processes) == [(0,), (1,)]
+    assert processes[(0,)].args == ([0], "data0.csv", "worker-1")
+    assert storage.statuses[0].lease_owner == "worker-1"
+    assert storage.statuses[2].state == AutoODMethodStatuses.PENDING
+
+
+def test_launch_groups_jobs_with_the_same_data(storage):
+    for i, path in enumerate(["a.csv", "b.csv", "a.csv", "a.csv"]):
+        storage.add(i, path)
+    job_scheduler = new_scheduler(max_workers=1, max_jobs_per_worker=2)
+
+    job_scheduler._launch()
+
+    assert list(running_processes(job_scheduler)) == [(0, 2)]
+    assert job_scheduler.running_jobs == 2
+
+
+def test_heartbeat_terminates_process_which_lost_its_lease(storage):
+    for i, path in enumerate(["a.csv", "a.csv", "b.csv"]):
+        storage.add(i, path)
+    job_scheduler = new_scheduler(max_workers=2, max_jobs_per_worker=2)
+    job_scheduler._launch()
+    processes = running_processes(job_scheduler)
+    # The lease of job 0 expired and another worker claimed it
+    storage.statuses[0].lease_owner = "worker-2"
+
+    job_scheduler._heartbeat()
+
+    assert processes[(0, 1)].terminated
+    assert not processes[(2,)].terminated
+    assert list(running_processes(job_scheduler)) == [(2,)]
+    assert storage.statuses[0].lease_owner == "worker-2"
+    # The other job of the terminated process is queued again
+    assert storage.statuses[1].state == AutoODMethodStatuses.PENDING
+    assert storage.statuses[1].lease_owner is None
+
+
+def test_reap_fails_crashed_jobs_and_releases_leases(storage):
+    storage.add(0, "a.csv")
+    job_scheduler = new_scheduler()
+    job_scheduler._launch()
+    process = running_processes(job_scheduler)[(0,)]
+    process.alive, process.exitcode = False, 1
+
+    job_scheduler._reap()
+
+    assert not job_scheduler._running
+    assert storage.statuses[0].state == AutoODMethodStatuses.FAILED
+    assert storage.statuses[0].lease_owner is None
+
+
+def test_reap_leaves_jobs_taken_over_by_other_workers(storage):
+    storage.add(0, "a.csv")
+    job_scheduler = new_scheduler()
+    job_scheduler._launch()
+    process = running_processes(job_scheduler)[(0,)]
+    process.alive, process.exitcode = False, 1
+    storage.statuses[0].lease_owner = "worker-2"
+
+    job_scheduler._reap()
+
+    assert storage.statuses[0].state == AutoODMethodStatuses.STARTED
+    assert storage.statuses[0].lease_owner == "worker-2"
+
+
+def test_job_status_is_not_saved_without_the_lease(monkeypatch):
+    monkeypatch.setattr(main.TrainingStatusStorage, "save_leased_status", lambda status: False)
+    model_status = TrainingStatus(model_version_id=0, training_data_path="a.csv",
+                                  state=AutoODMethodStatuses.STARTED, description="", lease_owner="worker-1")
+    with pytest.raises(main.LeaseLostError):
+        main.save_job_status(model_status)
+
+
+def test_job_taken_over_before_it_started_is_left_alone(monkeypatch):
+    storage = FakeStorage()
+    storage.add(0, "a.csv", state=AutoODMethodStatuses.STARTED, lease_owner="worker-2")
+    monkeypatch.setattr(main, "TrainingStatusStorage", storage)
+
+    main.train_and_deploy_monitoring_models([0], "a.csv", lease_owner="worker-1")
+
+    assert storage.statuses[0].state == AutoODMethodStatuses.STARTED
+    assert storage.statuses[0].lease_owner == "worker-2"
+
+
+def test_reap_leaves_jobs_awaiting_release(storage):
+    for i in range(2):
+        storage.add(i, "a.csv")
+    job_scheduler = new_scheduler(max_workers=1, max_jobs_per_worker=2)
+    job_scheduler._launch()
+    process = running_processes(job_scheduler)[(0, 1)]
+    storage.statuses[0].awaiting_release(42, 0.97)
+    process.alive, process.exitcode = False, -9
+
+    job_scheduler._reap()
+
+    assert storage.statuses[0].state == AutoODMethodStatuses.DEPLOYING
+    assert storage.statuses[0].pending_metric_model_version_id == 42
+    assert storage.statuses[1].state == AutoODMethodStatuses.FAILED
+    assert storage.statuses[1].description == "Training job exited with code -9"
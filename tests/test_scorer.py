@@ -0,0 +1,58 @@
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+from pyod.models.iforest import IForest
+from pyod.models.lof import LOF
+from pyod.models.ocsvm import OCSVM
+
+import hydro_auto_od
+from hydro_auto_od.scorer import save_scorer
+
+OD_SCORER_PATH = os.path.join(os.path.dirname(hydro_auto_od.__file__), "resources",
+                              "monitoring_model_template", "src", "od_scorer.py")
+
+
+def load_od_scorer():
+    spec = importlib.util.spec_from_file_location("od_scorer", OD_SCORER_PATH)
+    od_scorer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(od_scorer)
+    return od_scorer
+
+
+@pytest.fixture
+def data():
+    rng = np.random.RandomState(0)
+    X_train = np.vstack([rng.randn(300, 4), rng.uniform(-6, 6, size=(10, 4))])
+    X_test = np.vstack([rng.randn(50, 4), rng.uniform(-6, 6, size=(10, 4))])
+    return X_train, X_test
+
+
+@pytest.mark.parametrize("model", [
+    IForest(n_estimators=50, random_state=0),
+    LOF(n_neighbors=15),
+    OCSVM(),
+    OCSVM(kernel="linear"),
+    OCSVM(kernel="poly", degree=2),
+], ids=["IForest", "LOF", "OCSVM-rbf", "OCSVM-linear", "OCSVM-poly"])
+def test_scorer_matches_pyod(model, data, tmp_path):
+    X_train, X_test = data
+    model.fit(X_train)
+    path = str(tmp_path / "scorer.npz")
+
+    assert save_scorer(model, path)
+    scorer = load_od_scorer().load_scorer(path)
+
+    np.testing.assert_allclose(scorer.decision_function(X_test), model.decision_function(X_test),
+                               rtol=1e-7, atol=1e-9)
+    np.testing.assert_allclose(scorer.predict_proba(X_test, method='unify'),
+                               model.predict_proba(X_test, method='unify'), rtol=1e-7, atol=1e-9)
+
+
+def test_unsupported_models_are_not_exported(data, tmp_path):
+    X_train, _ = data
+    model = LOF(n_neighbors=15, metric="manhattan").fit(X_train)
+    path = tmp_path / "scorer.npz"
+    assert not save_scorer(model, str(path))
+    assert not path.exists()
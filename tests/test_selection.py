@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pyod.models.iforest import IForest
+from pyod.models.ocsvm import OCSVM
+
+from hydro_auto_od.selection import fit_model
+from hydro_auto_od.tuning import MassVolume, fit_rows
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(np.random.RandomState(0).randn(1000, 3), columns=["a", "b", "c"])
+
+
+def test_fit_rows_caps_only_row_capped_estimators(data):
+    X = data.to_numpy()
+    assert fit_rows(IForest(), X, max_fit_rows=100) is X
+    assert fit_rows(OCSVM(), X, max_fit_rows=None) is X
+    assert fit_rows(OCSVM(), X, max_fit_rows=len(X)) is X
+
+    rows = fit_rows(OCSVM(), X, max_fit_rows=100, random_state=0)
+    assert rows.shape == (100, 3)
+    np.testing.assert_array_equal(rows, fit_rows(OCSVM(), X, max_fit_rows=100, random_state=0))
+    # Rows are sampled without replacement and keep their order
+    assert len(np.unique(rows, axis=0)) == 100
+    row_ids = [np.flatnonzero((X == row).all(axis=1))[0] for row in rows]
+    assert row_ids == sorted(row_ids)
+
+
+def test_capped_ocsvm_is_calibrated_on_all_rows(data):
+    model = fit_model(OCSVM(contamination=0.05), data, max_fit_rows=100, random_state=0)
+
+    assert model.detector_.support_vectors_.shape[0] <= 100
+    assert len(model.decision_scores_) == len(data)
+    np.testing.assert_allclose(model.decision_scores_, model.decision_function(data.to_numpy()))
+    assert np.mean(model.decision_scores_ > model.threshold_) == pytest.approx(0.05, abs=0.002)
+
+
+def test_uncapped_models_are_fitted_on_all_rows(data):
+    model = fit_model(IForest(n_estimators=10, max_samples=1., random_state=0), data, max_fit_rows=100)
+    assert model.detector_.max_samples_ == len(data)
+    assert len(model.decision_scores_) == len(data)
+
+
+def test_mass_volume_fits_capped_ocsvm_on_a_sample(data):
+    X = data.to_numpy()
+    mv = MassVolume(X[800:], n_sim=1000, random_state=0)
+    clf = OCSVM()
+    volumes = mv.compute_mv(clf, X[:800], X[800:], np.arange(0.05, 1., 0.05), max_fit_rows=100)
+    assert clf.detector_.support_vectors_.shape[0] <= 100
+    assert np.all(np.diff(volumes) >= 0)
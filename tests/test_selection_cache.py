@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+from hydro_serving_grpc.serving.contract.field_pb2 import ModelField
+from hydro_serving_grpc.serving.contract.tensor_pb2 import TensorShape
+from hydro_serving_grpc.serving.contract.types_pb2 import DT_DOUBLE, DT_INT64
+
+from hydro_auto_od import main
+from hydro_auto_od.selection_cache import SelectionCache
+from hydro_auto_od.training_status_storage import AutoODMethodStatuses, TrainingStatus
+
+
+def scalar_field(name, dtype):
+    return ModelField(name=name, dtype=dtype, shape=TensorShape())
+
+
+def test_key_identifies_data_fields_and_setup():
+    fields = [scalar_field("a", DT_DOUBLE), scalar_field("b", DT_INT64)]
+    key = SelectionCache.key("sha256:1", fields, {"search": "exhaustive"})
+
+    assert key == SelectionCache.key("sha256:1", fields[::-1], {"search": "exhaustive"})
+    assert key != SelectionCache.key("sha256:2", fields, {"search": "exhaustive"})
+    assert key != SelectionCache.key("sha256:1", fields[:1], {"search": "exhaustive"})
+    assert key != SelectionCache.key("sha256:1", [scalar_field("a", DT_INT64), fields[1]], {"search": "exhaustive"})
+    assert key != SelectionCache.key("sha256:1", fields, {"search": "halving"})
+
+
+class FakeSelection:
+    """Records calls of the selection cache and of model selection made by fit_outlier_detector"""
+    def __init__(self, cached=None):
+        self.cached = cached
+        self.keys_computed = 0
+        self.selected = 0
+        self.stored = []
+
+    def key(self):
+        self.keys_computed += 1
+        return "key"
+
+    def get(self, key):
+        return self.cached
+
+    def put(self, key, model_name, model_params):
+        self.stored.append((key, model_name, model_params))
+
+    def select_model(self, data, **kwargs):
+        self.selected += 1
+        return "IForest", {"n_estimators": 10, "contamination": 0.04}
+
+
+@pytest.fixture
+def selection(monkeypatch):
+    selection = FakeSelection()
+    monkeypatch.setattr(main, "save_job_status", lambda model_status: None)
+    monkeypatch.setattr(main.SelectionCache, "get", selection.get)
+    monkeypatch.setattr(main.SelectionCache, "put", selection.put)
+    monkeypatch.setattr(main, "select_model", selection.select_model)
+    monkeypatch.setattr(main.config, "retrain_mode", "refit")
+    return selection
+
+
+@pytest.fixture
+def training_data():
+    return pd.DataFrame(np.random.RandomState(0).randn(100, 3), columns=["a", "b", "c"])
+
+
+def new_status(model_name=None, model_params=None):
+    return TrainingStatus(model_version_id=1, training_data_path="data.csv", state=AutoODMethodStatuses.STARTED,
+                          description="", model_name=model_name, model_params=model_params)
+
+
+def test_refit_does_not_compute_selection_cache_key(selection, training_data):
+    model_status = new_status("IForest", {"n_estimators": 10, "contamination": 0.04})
+
+    main.fit_outlier_detector(model_status, training_data, can_recalibrate=True, selection_cache_key=selection.key)
+
+    assert selection.keys_computed == 0
+    assert selection.selected == 0
+
+
+def test_cached_selection_is_reused(selection, training_data):
+    selection.cached = ("IForest", {"n_estimators": 20, "contamination": 0.04})
+    model_status = new_status()
+
+    outlier_detector = main.fit_outlier_detector(model_status, training_data, can_recalibrate=True,
+                                                 selection_cache_key=selection.key)
+
+    assert selection.keys_computed == 1
+    assert selection.selected == 0
+    assert model_status.model_name == "IForest"
+    assert outlier_detector.n_estimators == 20
+
+
+def test_selection_result_is_cached(selection, training_data):
+    model_status = new_status()
+
+    main.fit_outlier_detector(model_status, training_data, can_recalibrate=True, selection_cache_key=selection.key)
+
+    assert selection.keys_computed == 1
+    assert selection.selected == 1
+    assert selection.stored == [("key", "IForest", {"n_estimators": 10, "contamination": 0.04})]
+
+
+def test_disabled_cache_has_no_key(monkeypatch):
+    monkeypatch.setattr(main.config, "selection_cache_enabled", False)
+    assert main.get_selection_cache_key("data.csv", [scalar_field("a", DT_DOUBLE)]) is None
+
+
+def test_lookups_are_published_as_metrics(monkeypatch):
+    from hydro_auto_od import server
+    from hydro_auto_od.metrics import MetricsRegistry
+
+    monkeypatch.setattr(server, "metrics", MetricsRegistry())
+    monkeypatch.setattr(server, "start_metrics_server", lambda port: None)
+    monkeypatch.setattr(server.config, "service_mode", "api")
+    monkeypatch.setattr(server.config, "metrics_port", 9090)
+    monkeypatch.setattr(server.TrainingStatusStorage, "count_by_state", lambda state: 0)
+    monkeypatch.setattr(server.SelectionCache, "stats", lambda: {'hits': 3, 'misses': 5})
+
+    server.start_background_services()
+
+    rendered = server.metrics.render()
+    assert 'auto_od_selection_cache_lookups{result="hit"} 3' in rendered
+    assert 'auto_od_selection_cache_lookups{result="miss"} 5' in rendered
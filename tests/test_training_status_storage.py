@@ -0,0 +1,102 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from hydro_auto_od.training_status_storage import AutoODMethodStatuses, TrainingStatusStorage
+
+
+def matches(document, query):
+    """Evaluates the subset of MongoDB queries used by the lease methods"""
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(matches(document, subquery) for subquery in condition):
+                return False
+            continue
+        value = document.get(key)
+        if isinstance(condition, dict):
+            for operator, argument in condition.items():
+                if operator == '$in' and value not in argument:
+                    return False
+                if operator == '$lt' and (value is None or not value < argument):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def update_many(self, query, update):
+        matched = [document for document in self.documents if matches(document, query)]
+        for document in matched:
+            document.update(update['$set'])
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched))
+
+
+def job(model_version_id, state, lease_expires_in=None, deploy_started_at=None, lease_owner="worker-1"):
+    now = datetime.datetime.utcnow()
+    return {'model_version_id': model_version_id, 'status': state.value,
+            'lease_owner': lease_owner if lease_expires_in is not None else None,
+            'lease_expires_at': now + datetime.timedelta(seconds=lease_expires_in)
+            if lease_expires_in is not None else None,
+            'deploy_started_at': deploy_started_at}
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection([])
+    monkeypatch.setattr(TrainingStatusStorage, "_TrainingStatusStorage__collection", staticmethod(lambda: collection))
+    return collection
+
+
+def states(collection):
+    return {document['model_version_id']: AutoODMethodStatuses(document['status']) for document in collection.documents}
+
+
+def test_requeue_expired_leases(collection):
+    collection.documents = [
+        job(0, AutoODMethodStatuses.SELECTING_MODEL, lease_expires_in=-10),
+        job(1, AutoODMethodStatuses.SELECTING_MODEL, lease_expires_in=60),
+        # Stopped while uploading the monitoring model
+        job(2, AutoODMethodStatuses.DEPLOYING, lease_expires_in=-10),
+        # Uploaded, the release watcher finishes it
+        job(3, AutoODMethodStatuses.DEPLOYING, lease_expires_in=-10, deploy_started_at=datetime.datetime.utcnow()),
+        job(4, AutoODMethodStatuses.DEPLOYING, deploy_started_at=datetime.datetime.utcnow()),
+        job(5, AutoODMethodStatuses.SUCCESS),
+        # Left by a version of the service without leases
+        job(6, AutoODMethodStatuses.STARTED),
+    ]
+
+    assert TrainingStatusStorage.requeue_expired_leases() == 3
+
+    assert states(collection) == {
+        0: AutoODMethodStatuses.PENDING,
+        1: AutoODMethodStatuses.SELECTING_MODEL,
+        2: AutoODMethodStatuses.PENDING,
+        3: AutoODMethodStatuses.DEPLOYING,
+        4: AutoODMethodStatuses.DEPLOYING,
+        5: AutoODMethodStatuses.SUCCESS,
+        6: AutoODMethodStatuses.PENDING,
+    }
+    assert collection.documents[2]['lease_owner'] is None
+
+
+def test_requeue_leases_of_a_stopped_process(collection):
+    collection.documents = [
+        job(0, AutoODMethodStatuses.STARTED, lease_expires_in=60),
+        job(1, AutoODMethodStatuses.DEPLOYING, lease_expires_in=60),
+        job(2, AutoODMethodStatuses.DEPLOYING, lease_expires_in=60, deploy_started_at=datetime.datetime.utcnow()),
+        job(3, AutoODMethodStatuses.STARTED, lease_expires_in=60, lease_owner="worker-2"),
+    ]
+
+    assert TrainingStatusStorage.requeue_leases([0, 1, 2, 3], "worker-1") == 2
+
+    assert states(collection) == {
+        0: AutoODMethodStatuses.PENDING,
+        1: AutoODMethodStatuses.PENDING,
+        2: AutoODMethodStatuses.DEPLOYING,
+        3: AutoODMethodStatuses.STARTED,
+    }
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from pyod.models.iforest import IForest
+from pyod.models.lof import LOF
+from pyod.models.ocsvm import OCSVM
+
+from hydro_auto_od.tuning import (MassVolume, TuningBudget, _iforest_level_set_volumes, _lof_level_set_volumes,
+                                  draw_feature_subsets, low_tuning)
+
+
+def test_mass_volume_of_narrow_integer_data():
+    X = np.array([[0, 0, 0], [100, 100, 100]], dtype=np.int8)
+    mv = MassVolume(X, n_sim=10, random_state=0)
+    assert mv.volume_support == 100. ** 3
+    assert mv.U.min() >= 0 and mv.U.max() <= 100
+
+
+def test_draw_feature_subsets_of_narrow_integer_data():
+    # The volume of every 5 feature subset, 100 ** 5, does not fit int8
+    X = np.tile(np.array([[0], [100]], dtype=np.int8), (1, 6))
+    subsets = draw_feature_subsets(X, n_subsets=3, random_state=0)
+    assert len(subsets) == 3
+
+
+@pytest.fixture
+def selection_data():
+    rng = np.random.RandomState(0)
+    X = rng.randn(300, 6)
+    return X[:240], X[240:]
+
+
+@pytest.mark.parametrize("search", ["exhaustive", "halving"])
+def test_search_stays_within_budget(selection_data, search):
+    X_train, X_test = selection_data
+    budget = TuningBudget(max_fits=8)
+    best = low_tuning(X_train, X_test, [IForest, LOF, OCSVM], n_sim=1000, random_state=0,
+                      search=search, budget=budget)
+    assert best in (IForest, LOF, OCSVM)
+    # The first round or batch of subsets always runs, later ones only while they fit in the budget
+    assert 3 <= budget.n_fits <= 8
+
+
+def test_exhaustive_search_without_budget_limit_scores_every_subset(selection_data):
+    X_train, X_test = selection_data
+    budget = TuningBudget()
+    low_tuning(X_train, X_test, [IForest, LOF, OCSVM], n_sim=1000, random_state=0, budget=budget)
+    # 6 subsets of 5 features, 3 candidates each
+    assert budget.n_fits == 18
+
+
+@pytest.fixture
+def level_set_data():
+    rng = np.random.RandomState(0)
+    X = rng.randn(200, 3)
+    X_train, X_test = X[:150], X[150:]
+    return MassVolume(X_test, n_sim=2000, random_state=0), X_train, X_test, np.arange(0.05, 1., 0.05)
+
+
+def test_shared_lof_volumes_match_separate_fits(level_set_data):
+    mv, X_train, X_test, alphas = level_set_data
+    ks = [5, 10, 20]
+
+    volumes = _lof_level_set_volumes(mv, X_train, X_test, [{'n_neighbors': k} for k in ks], alphas,
+                                     approx_rows=None, seed=0)
+
+    for k, volume in zip(ks, volumes):
+        np.testing.assert_allclose(volume, mv.compute_mv(LOF(n_neighbors=k), X_train, X_test, alphas))
+
+
+def test_shared_iforest_volumes_match_separate_fits(level_set_data):
+    mv, X_train, X_test, alphas = level_set_data
+    n_estimators = [10, 25, 50]
+
+    volumes = _iforest_level_set_volumes(mv, X_train, X_test, [{'n_estimators': n} for n in n_estimators], alphas,
+                                         approx_rows=None, seed=7)
+
+    for n, volume in zip(n_estimators, volumes):
+        np.testing.assert_allclose(volume, mv.compute_mv(IForest(n_estimators=n, random_state=7), X_train, X_test,
+                                                         alphas))